@@ -3,13 +3,28 @@ from flask_cors import CORS
 from flask_session import Session
 from flask_pymongo import PyMongo
 from config import Config
-from socket_events import socketio, register_socketio_events
+from socket_events import socketio, register_socketio_events, init_socketio
+from services.feed_cache import feed_cache
+from services.presence import presence
+from services.face_models import face_model_pool, face_batcher
+from models.indexes import ensure_indexes
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 mongo = PyMongo(app)
 app.mongo = mongo
+feed_cache.init_app(app)
+presence.init_app(app)
+face_model_pool.init_app(app)
+face_batcher.init_app(app)
+
+if app.config.get("ENSURE_INDEXES"):
+    try:
+        for collection, error in ensure_indexes(mongo.db).items():
+            app.logger.warning(f"Could not create indexes on {collection}: {error}")
+    except Exception as e:
+        app.logger.error(f"Index bootstrap failed: {e}")
 
 Session(app)
 CORS(app, supports_credentials=True, origins=["http://localhost:3000"])
@@ -28,6 +43,7 @@ from routes.match import match_bp
 from routes.chat import chat_bp
 from routes.user_routes import user_bp
 from routes.report import report_bp
+from routes.faceregister import face_bp
 
 app.register_blueprint(register_bp, url_prefix='/auth')
 app.register_blueprint(login_bp, url_prefix='/auth')
@@ -37,8 +53,9 @@ app.register_blueprint(match_bp, url_prefix='/matches')
 app.register_blueprint(chat_bp, url_prefix='/chat')
 app.register_blueprint(user_bp)
 app.register_blueprint(report_bp)
+app.register_blueprint(face_bp)
 
 if __name__ == '__main__':
-    socketio.init_app(app)
+    init_socketio(app)
     socketio.run(app, host='127.0.0.1', port=5050, debug=True)
 # socketio.run(app, host='0.0.0.0', port=5050, debug=True)
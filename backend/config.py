@@ -13,6 +13,47 @@ class Config:
     SESSION_TYPE = 'filesystem'
     SESSION_PERMANENT = False
 
+    # Run the backfills and create the indexes declared in models/indexes.py
+    # when the app starts (matches without pair_key are keyed and deduped,
+    # chat messages get conversation_id and conversations their summaries)
+    ENSURE_INDEXES = os.getenv('ENSURE_INDEXES', 'true').lower() == 'true'
+
+    # Retrieve feed candidates with $geoNear on user_details.location_geo.
+    # Run seeders/normalize_locations.py before turning this on.
+    MATCH_GEO_RETRIEVAL = os.getenv('MATCH_GEO_RETRIEVAL', 'false').lower() == 'true'
+
+    # Ranked feed cache for /matches/get_profiles: "memory" (per process) or "mongo" (shared)
+    FEED_CACHE_BACKEND = os.getenv('FEED_CACHE_BACKEND', 'memory')
+    FEED_CACHE_TTL = int(os.getenv('FEED_CACHE_TTL', 300))
+    FEED_CACHE_SIZE = int(os.getenv('FEED_CACHE_SIZE', 1000))
+
+    # Persist chat messages from a background queue instead of inside send_message
+    CHAT_WRITE_BEHIND = os.getenv('CHAT_WRITE_BEHIND', 'false').lower() == 'true'
+    CHAT_WRITE_QUEUE_SIZE = int(os.getenv('CHAT_WRITE_QUEUE_SIZE', 10000))
+    CHAT_WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', 100))
+    CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv('CHAT_WRITE_FLUSH_INTERVAL', 0.05))
+
+    # Socket.IO message queue shared by all chat workers, e.g. redis://localhost:6379/0
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+
+    # Online presence: "memory" (single process) or "mongo" (shared by all workers)
+    PRESENCE_BACKEND = os.getenv('PRESENCE_BACKEND', 'memory')
+    PRESENCE_HEARTBEAT_INTERVAL = int(os.getenv('PRESENCE_HEARTBEAT_INTERVAL', 30))
+    PRESENCE_WORKER_ID = os.getenv('PRESENCE_WORKER_ID')
+    # Presence changes within this many seconds go out as one update
+    PRESENCE_COALESCE_WINDOW = float(os.getenv('PRESENCE_COALESCE_WINDOW', 0.5))
+
+    # Copies of the face/age models for /detect-age (default: one per core)
+    FACE_MODEL_POOL_SIZE = int(os.getenv('FACE_MODEL_POOL_SIZE', 0)) or None
+    FACE_MODEL_CHECKOUT_TIMEOUT = float(os.getenv('FACE_MODEL_CHECKOUT_TIMEOUT', 10))
+    # Load and warm up the models at startup instead of on the first request
+    FACE_MODEL_PRELOAD = os.getenv('FACE_MODEL_PRELOAD', 'false').lower() == 'true'
+    # Micro-batch concurrent /detect-age requests: up to MAX_SIZE images,
+    # waiting at most MAX_WAIT_MS for a batch to fill
+    FACE_BATCH_ENABLED = os.getenv('FACE_BATCH_ENABLED', 'false').lower() == 'true'
+    FACE_BATCH_MAX_SIZE = int(os.getenv('FACE_BATCH_MAX_SIZE', 8))
+    FACE_BATCH_MAX_WAIT_MS = float(os.getenv('FACE_BATCH_MAX_WAIT_MS', 5))
+
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER')
     if not UPLOAD_FOLDER:
         UPLOAD_FOLDER = os.path.join(basedir, '..', 'uploads')
@@ -0,0 +1,201 @@
+"""Load test for the Socket.IO chat path.
+
+Simulates N clients in pairs: each client connects, joins the room it shares
+with its partner and sends messages to it at a fixed rate. Clients are
+Flask-SocketIO test clients running in threads against the real handlers in
+socket_events, so a message counts as delivered once the partner's client
+has received it.
+
+    python loadtest/chat_loadtest.py --clients 50 --rate 20 --duration 10
+    python loadtest/chat_loadtest.py --mode both --db-latency 2
+    python loadtest/chat_loadtest.py --mongo-uri mongodb://localhost:27017/pairup_loadtest
+
+Without --mongo-uri the database is mongomock, which is in-memory. Use
+--db-latency to add a simulated round trip to every chat_messages write.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+if not os.getenv("FERNET_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["FERNET_KEY"] = Fernet.generate_key().decode()
+
+from flask import Flask
+from config import Config
+from socket_events import socketio, register_socketio_events, init_socketio
+from services.chat_writer import chat_writer
+from services.presence import presence
+
+MODES = ("sync", "write-behind")
+
+
+class SlowCollection:
+    """Adds a fixed delay to every write, standing in for a remote mongod."""
+
+    def __init__(self, collection, latency):
+        self._collection = collection
+        self._latency = latency
+
+    def insert_one(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return self._collection.insert_one(*args, **kwargs)
+
+    def insert_many(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return self._collection.insert_many(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class LoadTestDatabase:
+    def __init__(self, db, latency):
+        self._db = db
+        self.chat_messages = SlowCollection(db.chat_messages, latency) if latency else db.chat_messages
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self.chat_messages if name == "chat_messages" else self._db[name]
+
+
+def build_app(mode, mongo_uri=None, db_latency=0.0):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["CHAT_WRITE_BEHIND"] = mode == "write-behind"
+    app.config["PRESENCE_BACKEND"] = "memory"
+
+    if mongo_uri:
+        from pymongo import MongoClient
+        db = MongoClient(mongo_uri).get_default_database()
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is not installed; pip install mongomock or pass --mongo-uri")
+        db = mongomock.MongoClient().pairup_loadtest
+
+    for collection in ("chat_messages", "conversations"):
+        db[collection].delete_many({})
+    app.mongo = SimpleNamespace(db=LoadTestDatabase(db, db_latency))
+
+    register_socketio_events(app)
+    presence.init_app(app)
+    init_socketio(app, async_mode="threading", message_queue=None)
+    return app
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(mode, clients, rate, duration, mongo_uri=None, db_latency=0.0):
+    app = build_app(mode, mongo_uri, db_latency)
+    emails = [f"loadtest{i}@pairup.test" for i in range(clients)]
+    sockets = [socketio.test_client(app, query_string=f"email={email}") for email in emails]
+    for i, client in enumerate(sockets):
+        partner = emails[i ^ 1]
+        client.emit('join_room', {'user1': emails[i], 'user2': partner})
+        client.get_received()
+
+    latencies = [[] for _ in sockets]
+    start_barrier = threading.Barrier(len(sockets) + 1)
+
+    def sender(i):
+        client = sockets[i]
+        message = {'sender': emails[i], 'receiver': emails[i ^ 1], 'message': "x" * 80}
+        interval = 1.0 / rate
+        start_barrier.wait()
+        next_send = time.perf_counter()
+        deadline = next_send + duration
+        while next_send < deadline:
+            sent = time.perf_counter()
+            # The test client delivers to the partner before emit() returns.
+            client.emit('send_message', message)
+            latencies[i].append(time.perf_counter() - sent)
+            next_send += interval
+            pause = next_send - time.perf_counter()
+            if pause > 0:
+                time.sleep(pause)
+
+    threads = [threading.Thread(target=sender, args=(i,)) for i in range(len(sockets))]
+    for thread in threads:
+        thread.start()
+
+    start_barrier.wait()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for thread in threads:
+        thread.join()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    drain_start = time.perf_counter()
+    if chat_writer.enabled:
+        chat_writer.stop()
+    drain = time.perf_counter() - drain_start
+
+    # Senders are in the room too and get their own messages echoed back;
+    # only count the copies that reached the receiver.
+    delivered = sum(
+        1
+        for email, client in zip(emails, sockets)
+        for packet in client.get_received()
+        if packet['name'] == 'receive_message' and packet['args'][0]['receiver'] == email
+    )
+    for client in sockets:
+        client.disconnect()
+
+    samples = [latency for client_latencies in latencies for latency in client_latencies]
+    return {
+        "mode": mode,
+        "sent": len(samples),
+        "delivered": delivered,
+        "persisted": app.mongo.db.chat_messages.count_documents({}),
+        "msgs_per_sec": len(samples) / wall if wall else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        # Client simulation runs in the same process, so this is an upper bound.
+        "cpu_pct": cpu / wall * 100 if wall else 0.0,
+        "drain_s": drain,
+    }
+
+
+def print_results(results):
+    columns = ["mode", "sent", "delivered", "persisted", "msgs_per_sec", "p50_ms", "p95_ms", "p99_ms", "cpu_pct", "drain_s"]
+    print("  ".join(f"{c:>12}" for c in columns))
+    for result in results:
+        print("  ".join(
+            f"{result[c]:>12.2f}" if isinstance(result[c], float) else f"{result[c]:>12}" for c in columns
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Socket.IO chat path")
+    parser.add_argument('--clients', type=int, default=20, help="simulated clients, paired up (must be even)")
+    parser.add_argument('--rate', type=float, default=10.0, help="messages per second sent by each client")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to send for")
+    parser.add_argument('--mode', choices=MODES + ("both",), default="sync", help="message persistence mode")
+    parser.add_argument('--mongo-uri', help="run against this MongoDB instead of mongomock")
+    parser.add_argument('--db-latency', type=float, default=0.0, help="ms added to every chat_messages write")
+    args = parser.parse_args()
+
+    if args.clients < 2 or args.clients % 2:
+        parser.error("--clients must be an even number of at least 2")
+
+    modes = MODES if args.mode == "both" else (args.mode,)
+    results = [
+        run(mode, args.clients, args.rate, args.duration, args.mongo_uri, args.db_latency / 1000.0)
+        for mode in modes
+    ]
+    print_results(results)
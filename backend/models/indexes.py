@@ -0,0 +1,120 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+from utils.conversation import backfill_conversation_ids, backfill_conversations, backfill_pair_keys
+
+# Must match the collation the feed queries run with, otherwise the planner
+# cannot use the preference index.
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "user_details": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel(
+            [("gender", ASCENDING), ("age", ASCENDING)],
+            name="gender_age_ci",
+            collation=CASE_INSENSITIVE
+        ),
+        IndexModel(
+            [("location_geo", "2dsphere"), ("gender", ASCENDING), ("age", ASCENDING)],
+            name="location_geo_gender_age_ci",
+            collation=CASE_INSENSITIVE
+        ),
+        IndexModel([("feature_updated_at", ASCENDING)], name="feature_updated_at"),
+    ],
+    "user_interests": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "swipes": [
+        IndexModel([("swiper", ASCENDING), ("target", ASCENDING)], name="swiper_target_unique", unique=True),
+        IndexModel([("swiper", ASCENDING), ("liked", ASCENDING)], name="swiper_liked"),
+        IndexModel([("target", ASCENDING), ("liked", ASCENDING)], name="target_liked"),
+    ],
+    "matches": [
+        IndexModel([("users", ASCENDING)], name="users"),
+        IndexModel(
+            [("pair_key", ASCENDING)],
+            name="pair_key_unique",
+            unique=True,
+            partialFilterExpression={"pair_key": {"$exists": True}}
+        ),
+    ],
+    "notifications": [
+        IndexModel(
+            [("to", ASCENDING), ("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="to_type_timestamp_id"
+        ),
+        IndexModel([("to", ASCENDING), ("from", ASCENDING), ("type", ASCENDING)], name="to_from_type"),
+    ],
+    "chat_messages": [
+        IndexModel(
+            [("conversation_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+            name="conversation_timestamp_id"
+        ),
+    ],
+    "conversations": [
+        IndexModel([("participants", ASCENDING), ("last_timestamp", DESCENDING)], name="participants_last_timestamp"),
+    ],
+    "read_receipts": [
+        IndexModel([("user", ASCENDING), ("chat_with", ASCENDING)], name="user_chat_with_unique", unique=True),
+    ],
+    "presence_workers": [
+        IndexModel([("seen_at", ASCENDING)], name="seen_at"),
+    ],
+    "feed_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        IndexModel([("entries.email", ASCENDING)], name="entries_email"),
+    ],
+}
+
+# Data fixes a collection needs before its indexes can be built. They run on
+# every start, so each one only touches documents that still need fixing and
+# skips its collection-wide work once the index it prepares for exists.
+BACKFILLS = {
+    # History and the inbox query by conversation_id and read summaries;
+    # messages from before either existed would not show up at all.
+    "chat_messages": backfill_conversation_ids,
+    "conversations": backfill_conversations,
+    # pair_key_unique: legacy matches have no pair_key, and swipes would
+    # neither find nor dedupe them.
+    "matches": backfill_pair_keys,
+}
+
+
+def ensure_indexes(db):
+    """Run the backfills and create every declared index. Safe to run repeatedly.
+
+    Returns ``{collection: error message}`` for collections whose indexes
+    could not be built (e.g. duplicate values under a unique index).
+    """
+    errors = {}
+    for collection, indexes in INDEXES.items():
+        try:
+            if collection in BACKFILLS:
+                BACKFILLS[collection](db[collection])
+            db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            errors[collection] = str(e)
+    return errors
+
+
+def index_report(db):
+    report = {}
+    for collection, indexes in INDEXES.items():
+        declared = {index.document["name"] for index in indexes}
+        existing = set(db[collection].index_information()) - {"_id_"}
+
+        try:
+            stats = {s["name"]: s["accesses"]["ops"] for s in db[collection].aggregate([{"$indexStats": {}}])}
+        except OperationFailure:
+            stats = {}
+
+        report[collection] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(name for name in existing if stats.get(name) == 0),
+        }
+    return report
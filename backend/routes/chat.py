@@ -8,7 +8,22 @@ chat_service = ChatService()
 def chat_history():
     user1 = request.args.get('user1')
     user2 = request.args.get('user2')
-    return chat_service.get_chat_history(user1, user2)
+    return chat_service.get_chat_history(
+        user1, user2,
+        before=request.args.get('before'),
+        after=request.args.get('after'),
+        limit=request.args.get('limit')
+    )
+
+@chat_bp.route('/conversations')
+def conversations():
+    user = request.args.get('user')
+    return chat_service.get_conversations(user)
+
+@chat_bp.route('/presence')
+def presence_snapshot():
+    email = request.args.get('email')
+    return chat_service.get_presence(email)
 
 @chat_bp.route('/read_receipt', methods=['POST'])
 def update_read_receipt():
@@ -2,22 +2,13 @@ from flask import Blueprint, request, jsonify, session
 import cv2
 import numpy as np
 import base64
-import os
+from services.face_models import face_model_pool, face_batcher, MODEL_MEAN_VALUES
+from utils.offload import run_blocking
 
 face_bp = Blueprint('face', __name__)
 
-# model load
-faceProto = "backend/facedetect/opencv_face_detector.pbtxt"
-faceModel = "backend/facedetect/opencv_face_detector_uint8.pb"
-ageProto = "backend/facedetect/age_deploy.prototxt"
-ageModel = "backend/facedetect/age_net.caffemodel"
-
-faceNet = cv2.dnn.readNet(faceModel, faceProto)
-ageNet = cv2.dnn.readNet(ageModel, ageProto)
-
 ageList = ['(0-2)', '(4-6)', '(8-12)', '(15-20)', '(25-32)',
            '(38-43)', '(48-53)', '(60-100)']
-MODEL_MEAN_VALUES = (78.4263377603, 87.7689143744, 114.895847746)
 
 def highlightFace(net, frame, conf_threshold=0.7):
     frameHeight, frameWidth = frame.shape[:2]
@@ -36,6 +27,21 @@ def highlightFace(net, frame, conf_threshold=0.7):
             faceBoxes.append([x1, y1, x2, y2])
     return faceBoxes
 
+def predictAges(frame):
+    if face_batcher.enabled:
+        return face_batcher.detect_ages(frame)
+    with face_model_pool.checkout() as models:
+        agePredictions = []
+        for faceBox in highlightFace(models.face_net, frame):
+            face = frame[max(0, faceBox[1]-20):min(faceBox[3]+20, frame.shape[0]-1),
+                         max(0, faceBox[0]-20):min(faceBox[2]+20, frame.shape[1]-1)]
+
+            blob = cv2.dnn.blobFromImage(face, 1.0, (227, 227),
+                                         MODEL_MEAN_VALUES, swapRB=False)
+            models.age_net.setInput(blob)
+            agePredictions.append(models.age_net.forward())
+        return agePredictions
+
 @face_bp.route('/detect-age', methods=['POST'])
 def detect_age():
     try:
@@ -43,20 +49,17 @@ def detect_age():
         img_data = base64.b64decode(data['image'])
         nparr = np.frombuffer(img_data, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if frame is None or frame.size == 0:
+            return jsonify({"success": False, "message": "Could not read image."}), 400
+
+        # Waiting for a model copy or a batch blocks; keep it off the eventlet hub.
+        agePredictions = run_blocking(predictAges, frame)
 
-        faceBoxes = highlightFace(faceNet, frame)
-        if not faceBoxes:
+        if not agePredictions:
             return jsonify({"success": False, "message": "No face detected."}), 400
 
         results = []
-        for faceBox in faceBoxes:
-            face = frame[max(0, faceBox[1]-20):min(faceBox[3]+20, frame.shape[0]-1),
-                         max(0, faceBox[0]-20):min(faceBox[2]+20, frame.shape[1]-1)]
-
-            blob = cv2.dnn.blobFromImage(face, 1.0, (227, 227),
-                                         MODEL_MEAN_VALUES, swapRB=False)
-            ageNet.setInput(blob)
-            agePreds = ageNet.forward()
+        for agePreds in agePredictions:
             age_label = ageList[agePreds[0].argmax()]
             min_age = int(age_label[1:].split('-')[0])
 
@@ -79,9 +82,27 @@ def detect_age():
             "data": results
         }), 200
 
+    except TimeoutError:
+        return jsonify({
+            "success": False,
+            "message": "Age verification is busy, please try again."
+        }), 503
+
     except Exception as e:
         return jsonify({
             "success": False,
             "message": "Error processing image.",
             "error": str(e)
         }), 500
+
+@face_bp.route('/detect-age/health', methods=['GET'])
+def detect_age_health():
+    busy = False
+    if request.args.get('warm_up') == 'true':
+        try:
+            run_blocking(face_model_pool.warm_up)
+        except TimeoutError:
+            busy = True
+    status = face_model_pool.health()
+    status["batching"] = face_batcher.stats()
+    return jsonify(status), 503 if status["error"] or busy else 200
@@ -2,18 +2,31 @@ from flask import Blueprint, request, jsonify, current_app
 from services.match_service import MatchService
 from bson.errors import InvalidId
 from services.match_algorithm import MatchAlgorithm
+from utils.cursor import decode_cursor
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
 match_bp = Blueprint("match_bp", __name__)
 
+MAX_SWIPE_BATCH = 100
+
 @match_bp.route("/get_profiles", methods=["GET"])
 def get_profiles():
     email = request.args.get("email")
     if not email:
         return jsonify({"error": "Missing email"}), 400
-    service = MatchAlgorithm(current_app.mongo.db)
-    profiles = service.get_profiles(request, email)
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = min(max(int(limit), 1), MatchAlgorithm.MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+
+    service = MatchAlgorithm(current_app.mongo.db, geo_retrieval=current_app.config.get("MATCH_GEO_RETRIEVAL", False))
+    try:
+        profiles = service.get_profiles(request, email, limit=limit, cursor=request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(profiles), 200
 
 @match_bp.route("/get_similar_profiles", methods=["GET"])
@@ -24,8 +37,15 @@ def get_similar_profiles():
         print("Missing profile_email in request.args")
         return jsonify({"error": "Missing profile_email"}), 400
 
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MatchAlgorithm.MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
     service = MatchAlgorithm(current_app.mongo.db)
-    result = service.get_similar_profiles_for_profile(request, profile_email)
+    result = service.get_similar_profiles_for_profile(request, profile_email, limit=limit)
+    if result is None:
+        return jsonify({"error": "Profile not found"}), 404
     return jsonify(result), 200
 
 @match_bp.route("/swipe", methods=["POST"])
@@ -39,16 +59,41 @@ def swipe():
         return jsonify({"error": "Missing fields"}), 400
 
     service = MatchService(current_app.mongo.db)
-    result = service.swipe(swiper, target, liked)
+    result = service.swipe(swiper, target, liked, request=request)
     return jsonify(result), 200
 
+@match_bp.route("/swipe/batch", methods=["POST"])
+def swipe_batch():
+    data = request.get_json() or {}
+    swiper = data.get("swiper_email")
+    swipes = data.get("swipes")
+
+    if not swiper or not isinstance(swipes, list):
+        return jsonify({"error": "Missing fields"}), 400
+    if len(swipes) > MAX_SWIPE_BATCH:
+        return jsonify({"error": f"At most {MAX_SWIPE_BATCH} swipes per batch"}), 400
+
+    service = MatchService(current_app.mongo.db)
+    results = service.swipe_batch(swiper, swipes, request=request)
+    return jsonify({"results": results}), 200
+
 @match_bp.route("/notifications", methods=["GET"])
 def get_notifications():
     email = request.args.get("email")
     if not email:
         return jsonify({"error": "Missing email"}), 400
+    # Pass the `cursor` of the last notification received as `before` to
+    # fetch the next (older) page, or of the newest one held as `after` to
+    # fetch only what arrived since.
+    try:
+        before = decode_cursor(request.args.get("before"))
+        after = decode_cursor(request.args.get("after"))
+        limit = min(max(int(request.args.get("limit", 50)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "Invalid before, after or limit"}), 400
+
     service = MatchService(current_app.mongo.db)
-    notes = service.get_notifications(email, request)
+    notes = service.get_notifications(email, request, before=before, after=after, limit=limit)
     return jsonify(notes), 200
 
 @match_bp.route("/notifications/read", methods=["POST"])
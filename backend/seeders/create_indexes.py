@@ -0,0 +1,42 @@
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from models.indexes import ensure_indexes, index_report
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def create_indexes():
+    errors = ensure_indexes(mongo.db)
+    for collection, error in errors.items():
+        print(f"  {collection}: {error}")
+    print("Indexes created" if not errors else f"Indexes created with {len(errors)} error(s)")
+
+
+def report_indexes():
+    for collection, status in index_report(mongo.db).items():
+        print(f"{collection}:")
+        print(f"  missing:    {', '.join(status['missing']) or '-'}")
+        print(f"  undeclared: {', '.join(status['undeclared']) or '-'}")
+        print(f"  unused:     {', '.join(status['unused']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create or inspect the backend's MongoDB indexes")
+    parser.add_argument('--report', action='store_true', help="show missing/unused indexes instead of creating them")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.report:
+            report_indexes()
+        else:
+            create_indexes()
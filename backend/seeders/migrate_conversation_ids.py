@@ -0,0 +1,26 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from utils.conversation import backfill_conversation_ids, rebuild_conversations
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def migrate():
+    updated = backfill_conversation_ids(mongo.db.chat_messages)
+    print(f"Added conversation_id to {updated} chat messages")
+    rebuilt = rebuild_conversations(mongo.db)
+    print(f"Rebuilt {rebuilt} conversation summaries")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrate()
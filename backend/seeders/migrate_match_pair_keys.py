@@ -0,0 +1,27 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from models.indexes import INDEXES
+from utils.conversation import backfill_pair_keys
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def migrate():
+    updated, removed = backfill_pair_keys(mongo.db.matches)
+    print(f"Added pair_key to {updated} matches, removed {removed} duplicates")
+    mongo.db.matches.create_indexes(INDEXES["matches"])
+    print("Match indexes created")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrate()
@@ -0,0 +1,28 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from utils.age import normalize_ages
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def normalize_all():
+    updated, invalid = normalize_ages(mongo.db.user_details)
+    print(f"Stored age as a number for {updated} profiles")
+    if invalid:
+        print(f"{len(invalid)} profiles have an age that is not a number; fix them by hand:")
+        for detail_id in invalid:
+            print(f"  user_details {detail_id}")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        normalize_all()
@@ -0,0 +1,24 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from utils.geo import normalize_locations
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def normalize_all():
+    updated = normalize_locations(mongo.db.user_details)
+    print(f"Normalized location_geo for {updated} profiles")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        normalize_all()
@@ -0,0 +1,25 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_pymongo import PyMongo
+from config import Config
+from services.feature_store import ProfileFeatureStore
+
+app = Flask(__name__)
+app.config["MONGO_URI"] = Config.MONGO_URI
+
+mongo = PyMongo(app)
+
+
+def reindex_features():
+    store = ProfileFeatureStore(mongo.db)
+    updated = store.reindex()
+    print(f"Re-indexed feature vectors for {updated} profiles")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        reindex_features()
@@ -1,10 +1,15 @@
 from flask import current_app, jsonify 
 from datetime import datetime
-from utils.encryption import decrypt_message
+from utils.encryption import decrypt_message, decrypt_messages
+from utils.conversation import get_conversation_id
+from utils.cursor import cursor_query, cursor_sort, decode_cursor, encode_cursor, parse_timestamp
+from services.presence import presence
 
 class ChatService:
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
 
-    def serialize_message(self, msg):
+    def serialize_message(self, msg, decrypted_msg=None):
         ts = msg.get('timestamp')
         if isinstance(ts, datetime):
             ts_iso = ts.isoformat()
@@ -14,34 +19,57 @@ class ChatService:
             except Exception:
                 ts_iso = datetime.utcnow().isoformat()
 
-        encrypted_msg = msg.get('message', '')
-        try:
-            decrypted_msg = decrypt_message(encrypted_msg)
-        except Exception as e:
-            decrypted_msg = encrypted_msg
+        if decrypted_msg is None:
+            encrypted_msg = msg.get('message', '')
+            try:
+                decrypted_msg = decrypt_message(encrypted_msg)
+            except Exception as e:
+                decrypted_msg = encrypted_msg
 
-        return {
+        serialized = {
             'sender': msg.get('sender', ''),
             'receiver': msg.get('receiver', ''),
             'message': decrypted_msg,
             'timestamp': ts_iso,
         }
+        if isinstance(ts, datetime) and msg.get('_id'):
+            serialized['_id'] = str(msg['_id'])
+            serialized['cursor'] = encode_cursor(msg)
+        return serialized
 
-    def get_chat_history(self, user1, user2):
+    def get_chat_history(self, user1, user2, before=None, after=None, limit=None):
         if not user1 or not user2:
             return jsonify({'error': 'Missing user1 or user2 parameter'}), 400
 
+        try:
+            before = decode_cursor(before)
+            after = decode_cursor(after)
+            limit = min(max(int(limit or self.DEFAULT_PAGE_SIZE), 1), self.MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': 'Invalid before, after or limit parameter'}), 400
+
+        query = {'conversation_id': get_conversation_id(user1, user2), **cursor_query(before, after)}
+
+        # Without `after` the newest page comes first and `before` walks back
+        # through older pages; with `after` the client catches up forwards.
+        # Either way the page itself is returned oldest to newest.
         mongo = current_app.mongo
-        messages_cursor = mongo.db.chat_messages.find({
-            '$or': [
-                {'sender': user1, 'receiver': user2},
-                {'sender': user2, 'receiver': user1}
-            ]
-        }).sort('timestamp', 1)
+        direction = 1 if after and not before else -1
+        page = list(mongo.db.chat_messages.find(query).sort(cursor_sort(direction)).limit(limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        if direction == -1:
+            page.reverse()
 
-        messages = [self.serialize_message(m) for m in messages_cursor]
+        plaintexts = decrypt_messages(m.get('message', '') for m in page)
+        messages = [self.serialize_message(m, text) for m, text in zip(page, plaintexts)]
 
-        return jsonify({'messages': messages})
+        return jsonify({
+            'messages': messages,
+            'has_more': has_more,
+            'oldest': messages[0].get('cursor') if messages else None,
+            'newest': messages[-1].get('cursor') if messages else None,
+        })
 
     def update_read_receipt(self, data):
         user = data.get('user')
@@ -50,6 +78,10 @@ class ChatService:
 
         if not user or not chat_with or not timestamp:
             return jsonify({"error": "Missing fields"}), 400
+        try:
+            read_until = parse_timestamp(timestamp)
+        except (AttributeError, ValueError):
+            return jsonify({"error": "Invalid timestamp"}), 400
 
         mongo = current_app.mongo
         mongo.db.read_receipts.update_one(
@@ -57,8 +89,73 @@ class ChatService:
             {"$set": {"last_read": timestamp}},
             upsert=True
         )
+        # Clients send the timestamp of the newest message on screen. Unless
+        # another message has arrived since, everything has been read.
+        key = str(sorted([user, chat_with]).index(user))
+        mongo.db.conversations.update_one(
+            {"_id": get_conversation_id(user, chat_with), "last_timestamp": {"$lte": read_until}},
+            {"$set": {f"unread.{key}": 0}}
+        )
         return jsonify({"message": "Read receipt updated"})
 
+    # Conversation summaries: one document per conversation in `conversations`,
+    # keyed by conversation_id, holding the last (encrypted) message and an
+    # unread counter per participant. Counters are keyed by the participant's
+    # position in the sorted `participants` list since emails cannot be used
+    # as field names.
+
+    def record_message(self, db, chat):
+        participants = sorted([chat['sender'], chat['receiver']])
+        receiver_key = str(participants.index(chat['receiver']))
+        db.conversations.update_one(
+            {"_id": chat['conversation_id']},
+            {
+                "$set": {
+                    "participants": participants,
+                    "last_message": chat['message'],
+                    "last_sender": chat['sender'],
+                    "last_timestamp": chat['timestamp'],
+                },
+                "$inc": {f"unread.{receiver_key}": 1},
+            },
+            upsert=True
+        )
+
+    def get_conversations(self, user):
+        if not user:
+            return jsonify({"error": "Missing user"}), 400
+
+        mongo = current_app.mongo
+        summaries = list(mongo.db.conversations.find({"participants": user}).sort("last_timestamp", -1))
+        previews = decrypt_messages(s.get("last_message", "") for s in summaries)
+
+        conversations = []
+        for summary, preview in zip(summaries, previews):
+            key = str(summary["participants"].index(user))
+            chat_with = next((p for p in summary["participants"] if p != user), user)
+            conversations.append({
+                "conversation_id": summary["_id"],
+                "chat_with": chat_with,
+                "last_message": preview,
+                "last_sender": summary.get("last_sender"),
+                "last_timestamp": summary["last_timestamp"].isoformat() if summary.get("last_timestamp") else None,
+                "unread_count": summary.get("unread", {}).get(key, 0),
+            })
+
+        return jsonify({"conversations": conversations})
+
+    def get_presence(self, email):
+        """Which of ``email``'s matches are online right now."""
+        if not email:
+            return jsonify({"error": "Missing email"}), 400
+
+        mongo = current_app.mongo
+        match_emails = set()
+        for match in mongo.db.matches.find({"users": email}, {"users": 1}):
+            match_emails.update(u for u in match["users"] if u != email)
+
+        return jsonify({"online": sorted(presence.online_among(match_emails))})
+
     def get_read_receipt(self, user, chat_with):
         if not user or not chat_with:
             return jsonify({"error": "Missing fields"}), 400
@@ -0,0 +1,136 @@
+import atexit
+import queue
+from pymongo.errors import BulkWriteError
+from utils.encryption import encrypt_message
+from utils.offload import run_blocking
+from services.chat_service import ChatService
+
+class ChatWriteBehind:
+    """Persists chat messages off the socket path.
+
+    ``handle_send_message`` emits to the room straight away and hands the
+    plaintext message to ``submit``. A background task started through
+    Socket.IO (a greenlet under eventlet, a thread otherwise) collects the
+    queued messages and has them encrypted and written with one
+    ``insert_many`` per batch on a native thread (``run_blocking``), then
+    emits ``message_persisted`` with the stored ``_id`` to the room.
+
+    The queue is bounded. When it is full, ``submit`` waits up to
+    ``enqueue_timeout`` seconds and then writes the message itself, so a slow
+    database slows senders down instead of growing memory without limit.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=100, flush_interval=0.05, enqueue_timeout=0.5):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.enabled = False
+        self.chat_service = ChatService()
+        self._socketio = None
+        self._db = None
+        self._queue = None
+        self._queue_empty = None
+        self._running = False
+
+    def init_app(self, app, socketio):
+        config = app.config
+        self.enabled = config.get("CHAT_WRITE_BEHIND", False)
+        self.max_queue = config.get("CHAT_WRITE_QUEUE_SIZE", self.max_queue)
+        self.batch_size = config.get("CHAT_WRITE_BATCH_SIZE", self.batch_size)
+        self.flush_interval = config.get("CHAT_WRITE_FLUSH_INTERVAL", self.flush_interval)
+        app.extensions["chat_writer"] = self
+        if not self.enabled:
+            return
+
+        self._socketio = socketio
+        self._db = app.mongo.db
+        # Use the queue type of the Socket.IO async mode so a blocked get()
+        # yields to other greenlets instead of stalling the eventlet hub.
+        self._queue = socketio.server.eio.create_queue(maxsize=self.max_queue)
+        self._queue_empty = socketio.server.eio.get_queue_empty_exception()
+        self._running = True
+        socketio.start_background_task(self._run)
+        atexit.register(self.stop)
+
+    def submit(self, chat):
+        """Queue ``chat`` (plaintext ``message``, pre-assigned ``_id``) for persistence."""
+        try:
+            self._queue.put(chat, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._write([chat])
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except self._queue_empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except self._queue_empty:
+                break
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        # Encryption and the inserts block; run them off the eventlet hub so
+        # other sockets keep being served, and emit back on this greenlet.
+        docs, failed = run_blocking(self._persist, batch)
+        for index, doc in enumerate(docs):
+            if index in failed:
+                self._socketio.emit('message_persist_failed', {"_id": str(doc["_id"])}, room=doc["conversation_id"])
+                continue
+            self._socketio.emit('message_persisted', {
+                "_id": str(doc["_id"]),
+                "timestamp": doc["timestamp"].isoformat(),
+            }, room=doc["conversation_id"])
+
+    def _persist(self, batch):
+        docs = [dict(chat, message=encrypt_message(chat["message"])) for chat in batch]
+        failed = set()
+        try:
+            self._db.chat_messages.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            print(" Error saving message batch to DB:", str(e))
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            print(" Error saving message batch to DB:", str(e))
+            failed = set(range(len(docs)))
+
+        for index, doc in enumerate(docs):
+            if index in failed:
+                continue
+            try:
+                self.chat_service.record_message(self._db, doc)
+            except Exception as e:
+                print(" Error updating conversation summary:", str(e))
+        return docs, failed
+
+    def flush(self):
+        """Write everything still queued from the calling thread."""
+        if self._queue is None:
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except self._queue_empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def stop(self):
+        self._running = False
+        self.flush()
+
+
+chat_writer = ChatWriteBehind()
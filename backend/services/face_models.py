@@ -0,0 +1,309 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+
+import numpy as np
+
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'facedetect'))
+
+FACE_PROTO = "opencv_face_detector.pbtxt"
+FACE_MODEL = "opencv_face_detector_uint8.pb"
+AGE_PROTO = "age_deploy.prototxt"
+AGE_MODEL = "age_net.caffemodel"
+
+FACE_MEAN_VALUES = (104, 117, 123)
+MODEL_MEAN_VALUES = (78.4263377603, 87.7689143744, 114.895847746)
+FACE_PADDING = 20
+
+
+class FaceModels:
+    """One face detector and one age net. Only one request may use it at a time."""
+
+    def __init__(self, face_net, age_net):
+        self.face_net = face_net
+        self.age_net = age_net
+
+
+class FaceModelPool:
+    """Independent copies of the face detector and age nets.
+
+    A ``cv2.dnn`` net keeps its input between ``setInput`` and ``forward``,
+    so one net cannot be shared by concurrent requests. Each request checks
+    out its own copy instead. OpenCV releases the GIL during ``forward``, so
+    copies in different threads run on different cores.
+
+    Models are loaded on first use, or up front by ``warm_up``.
+
+    Worker model: the pool (and the batcher's workers) use native threads
+    and blocking ``queue.Queue`` waits. The server runs under eventlet
+    without monkey patching, where such a wait would stall every
+    connection, so callers on the request path go through
+    ``utils.offload.run_blocking``: checkout, inference and waits for a
+    batch then run on eventlet's native thread pool (``eventlet.tpool``,
+    ``EVENTLET_THREADPOOL_SIZE`` threads, 20 by default) while the hub keeps
+    serving. More concurrent requests than that queue up for a tpool thread.
+    """
+
+    def __init__(self, size=None, model_dir=MODEL_DIR, checkout_timeout=10.0):
+        self.size = size or os.cpu_count() or 1
+        self.model_dir = model_dir
+        self.checkout_timeout = checkout_timeout
+        self._available = queue.Queue()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._warmed_up = False
+        self._error = None
+        self._load_seconds = None
+
+    def init_app(self, app):
+        config = app.config
+        self.size = config.get("FACE_MODEL_POOL_SIZE") or self.size
+        self.model_dir = config.get("FACE_MODEL_DIR") or self.model_dir
+        self.checkout_timeout = config.get("FACE_MODEL_CHECKOUT_TIMEOUT", self.checkout_timeout)
+        app.extensions["face_model_pool"] = self
+        if config.get("FACE_MODEL_PRELOAD"):
+            threading.Thread(target=self.warm_up, daemon=True).start()
+
+    def _path(self, name):
+        return os.path.join(self.model_dir, name)
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            import cv2
+
+            started = time.perf_counter()
+            try:
+                copies = [
+                    FaceModels(
+                        cv2.dnn.readNet(self._path(FACE_MODEL), self._path(FACE_PROTO)),
+                        cv2.dnn.readNet(self._path(AGE_MODEL), self._path(AGE_PROTO))
+                    )
+                    for _ in range(self.size)
+                ]
+            except cv2.error as e:
+                self._error = str(e)
+                raise RuntimeError(f"Could not load face models from {self.model_dir}: {e}")
+
+            # Parallelism comes from the pool; letting every forward pass also
+            # spread over all cores would oversubscribe them.
+            if self.size > 1:
+                cv2.setNumThreads(1)
+
+            for models in copies:
+                self._available.put(models)
+            self._error = None
+            self._loaded = True
+            self._load_seconds = time.perf_counter() - started
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow one ``FaceModels`` for the duration of the ``with`` block.
+
+        Raises ``TimeoutError`` if every copy stays busy for ``timeout``
+        seconds.
+        """
+        self._load()
+        try:
+            models = self._available.get(timeout=timeout or self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError("All face models are busy")
+        try:
+            yield models
+        finally:
+            self._available.put(models)
+
+    def warm_up(self, timeout=None):
+        """Load every copy and run one forward pass through each.
+
+        The first pass through a net allocates its buffers and is several
+        times slower than later ones; doing it here keeps that off the first
+        user requests. Raises ``TimeoutError`` if the copies in use are not
+        all returned within ``timeout`` seconds.
+        """
+        try:
+            self._load()
+        except RuntimeError:
+            return False
+
+        borrowed = []
+        deadline = time.perf_counter() + (timeout or self.checkout_timeout)
+        try:
+            for _ in range(self.size):
+                try:
+                    borrowed.append(self._available.get(timeout=max(deadline - time.perf_counter(), 0.001)))
+                except queue.Empty:
+                    raise TimeoutError("Face models are busy, could not warm up")
+            for models in borrowed:
+                models.face_net.setInput(np.zeros((1, 3, 300, 300), dtype=np.float32))
+                models.face_net.forward()
+                models.age_net.setInput(np.zeros((1, 3, 227, 227), dtype=np.float32))
+                models.age_net.forward()
+        finally:
+            for models in borrowed:
+                self._available.put(models)
+        self._warmed_up = True
+        return True
+
+    def health(self):
+        return {
+            "loaded": self._loaded,
+            "warmed_up": self._warmed_up,
+            "size": self.size,
+            "available": self._available.qsize(),
+            "load_seconds": self._load_seconds,
+            "error": self._error,
+        }
+
+
+class FaceInferenceBatcher:
+    """Runs /detect-age inference for concurrent requests in batches.
+
+    Requests wait up to ``max_wait`` seconds for others to arrive (or until
+    ``max_batch_size`` are queued); each batch then goes through the face
+    detector as one ``blobFromImages`` blob, and every face found in the
+    batch goes through the age net as a second one. One worker per pool copy
+    runs batches, so batching and the pool's parallelism combine.
+    """
+
+    def __init__(self, pool, max_batch_size=8, max_wait=0.005, conf_threshold=0.7):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.conf_threshold = conf_threshold
+        self.enabled = False
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._face_batch_sizes = Counter()
+
+    def init_app(self, app):
+        config = app.config
+        self.enabled = config.get("FACE_BATCH_ENABLED", False)
+        self.max_batch_size = config.get("FACE_BATCH_MAX_SIZE", self.max_batch_size)
+        self.max_wait = config.get("FACE_BATCH_MAX_WAIT_MS", self.max_wait * 1000) / 1000.0
+        app.extensions["face_batcher"] = self
+
+    def _start(self):
+        with self._stats_lock:
+            if self._workers:
+                return
+            for _ in range(self.pool.size):
+                worker = threading.Thread(target=self._run, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def detect_ages(self, frame, timeout=None):
+        """Age net output (shape ``(1, n_classes)``) for every face in ``frame``."""
+        self._start()
+        job = Future()
+        self._jobs.put((frame, job))
+        try:
+            return job.result(timeout=timeout or self.pool.checkout_timeout + 1)
+        except FutureTimeoutError:
+            raise TimeoutError("Face inference timed out")
+
+    def _collect(self):
+        batch = [self._jobs.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with self.pool.checkout() as models:
+                    try:
+                        results = self._infer(models, [frame for frame, _ in batch])
+                    except Exception:
+                        if len(batch) == 1:
+                            raise
+                        # One bad frame fails the whole blob; retry each
+                        # frame alone so only its own caller gets the error.
+                        self._infer_each(models, batch)
+                        continue
+            except Exception as e:
+                for _, job in batch:
+                    if not job.done():
+                        job.set_exception(e)
+                continue
+            for (_, job), result in zip(batch, results):
+                job.set_result(result)
+
+    def _infer_each(self, models, batch):
+        for frame, job in batch:
+            try:
+                job.set_result(self._infer(models, [frame])[0])
+            except Exception as e:
+                job.set_exception(e)
+
+    def _infer(self, models, frames):
+        import cv2
+
+        blob = cv2.dnn.blobFromImages(frames, 1.0, (300, 300), FACE_MEAN_VALUES, swapRB=True, crop=False)
+        models.face_net.setInput(blob)
+        detections = models.face_net.forward()
+
+        # Detections for the whole batch come back together; column 0 is the
+        # index of the image each one belongs to.
+        faces, owners = [], []
+        for detection in detections[0, 0]:
+            index, confidence = int(detection[0]), detection[2]
+            if index < 0 or confidence <= self.conf_threshold:
+                continue
+            frame = frames[index]
+            height, width = frame.shape[:2]
+            x1, y1 = int(detection[3] * width), int(detection[4] * height)
+            x2, y2 = int(detection[5] * width), int(detection[6] * height)
+            face = frame[max(0, y1 - FACE_PADDING):min(y2 + FACE_PADDING, height - 1),
+                         max(0, x1 - FACE_PADDING):min(x2 + FACE_PADDING, width - 1)]
+            if face.size:
+                faces.append(face)
+                owners.append(index)
+
+        results = [[] for _ in frames]
+        if faces:
+            blob = cv2.dnn.blobFromImages(faces, 1.0, (227, 227), MODEL_MEAN_VALUES, swapRB=False)
+            models.age_net.setInput(blob)
+            predictions = models.age_net.forward()
+            for row, owner in enumerate(owners):
+                results[owner].append(predictions[row:row + 1])
+
+        with self._stats_lock:
+            self._batch_sizes[len(frames)] += 1
+            if faces:
+                self._face_batch_sizes[len(faces)] += 1
+        return results
+
+    def stats(self):
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            requests = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": batches,
+                "requests": requests,
+                "mean_batch_size": requests / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "face_batch_sizes": dict(sorted(self._face_batch_sizes.items())),
+            }
+
+
+face_model_pool = FaceModelPool()
+face_batcher = FaceInferenceBatcher(face_model_pool)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from math import sqrt
+from pymongo import UpdateOne
+
+class ProfileFeatureStore:
+    """Precomputed bag-of-words vectors for profile compatibility scoring.
+
+    Each user_details document carries a ``feature_vector`` of the form
+    ``{"tokens": [...], "weights": [...]}``: the vocabulary tokens found in the
+    profile and their L2-normalized counts, so content similarity between two
+    profiles is a plain dot product. ``feature_updated_at`` records when the
+    vector last changed, so other workers can refresh their similarity index.
+    """
+
+    FEATURE_FIELDS = ("religion", "education", "profession", "hobbies", "personality")
+
+    def __init__(self, db):
+        self.details = db["user_details"]
+
+    @staticmethod
+    def _field_text(value):
+        if not value:
+            return ""
+        if isinstance(value, (list, tuple)):
+            return " ".join(str(v) for v in value if v)
+        return str(value)
+
+    def profile_features(self, detail):
+        detail = detail or {}
+        return {field: self._field_text(detail.get(field)) for field in self.FEATURE_FIELDS}
+
+    def build_vector(self, detail):
+        counts = {}
+        for text in self.profile_features(detail).values():
+            for word in text.lower().split():
+                counts[word] = counts.get(word, 0) + 1
+
+        norm = sqrt(sum(c * c for c in counts.values()))
+        tokens = sorted(counts)
+        weights = [counts[t] / norm for t in tokens] if norm else []
+        return {"tokens": tokens if norm else [], "weights": weights}
+
+    def get_vector(self, detail):
+        vector = (detail or {}).get("feature_vector")
+        if vector and "tokens" in vector and "weights" in vector:
+            return vector
+        return self.build_vector(detail)
+
+    @staticmethod
+    def similarity(vec1, vec2):
+        if not vec1["tokens"] or not vec2["tokens"]:
+            return 0
+        weights = dict(zip(vec1["tokens"], vec1["weights"]))
+        return sum(weights.get(t, 0) * w for t, w in zip(vec2["tokens"], vec2["weights"]))
+
+    def refresh(self, user_id):
+        detail = self.details.find_one({"user_id": user_id})
+        if not detail:
+            return None
+        vector = self.build_vector(detail)
+        self.details.update_one(
+            {"_id": detail["_id"]},
+            {"$set": {"feature_vector": vector, "feature_updated_at": datetime.utcnow()}}
+        )
+        return vector
+
+    def reindex(self, batch_size=500):
+        projection = {field: 1 for field in self.FEATURE_FIELDS}
+        ops = []
+        updated = 0
+        for detail in self.details.find({}, projection):
+            ops.append(UpdateOne(
+                {"_id": detail["_id"]},
+                {"$set": {"feature_vector": self.build_vector(detail), "feature_updated_at": datetime.utcnow()}}
+            ))
+            if len(ops) >= batch_size:
+                updated += self.details.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += self.details.bulk_write(ops, ordered=False).modified_count
+        return updated
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+class InMemoryFeedCacheBackend:
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._feeds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._feeds.get(key)
+            if item is None:
+                return None
+            expires_at, feed = item
+            if expires_at < time.monotonic():
+                del self._feeds[key]
+                return None
+            self._feeds.move_to_end(key)
+            # Hand out a copy so callers cannot change the cached feed.
+            return {"entries": list(feed["entries"]), "total": feed["total"]}
+
+    def set(self, key, feed, ttl):
+        with self._lock:
+            feed = dict(feed, members={e["email"] for e in feed["entries"]})
+            self._feeds[key] = (time.monotonic() + ttl, feed)
+            self._feeds.move_to_end(key)
+            while len(self._feeds) > self.max_entries:
+                self._feeds.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._feeds.pop(key, None)
+
+    def remove_entry(self, key, candidate_email):
+        with self._lock:
+            item = self._feeds.get(key)
+            if item is None or candidate_email not in item[1]["members"]:
+                return
+            feed = item[1]
+            feed["entries"] = [e for e in feed["entries"] if e["email"] != candidate_email]
+            feed["members"].discard(candidate_email)
+            feed["total"] -= 1
+
+    def remove_entries(self, key, candidate_emails):
+        for candidate_email in candidate_emails:
+            self.remove_entry(key, candidate_email)
+
+    def remove_from_feeds(self, keys, candidate_email):
+        for key in keys:
+            self.remove_entry(key, candidate_email)
+
+    def delete_containing(self, candidate_email):
+        with self._lock:
+            stale = [k for k, (_, feed) in self._feeds.items() if candidate_email in feed["members"]]
+            for key in stale:
+                del self._feeds[key]
+
+
+class MongoFeedCacheBackend:
+    """Shared backend so every worker process sees the same cached feeds.
+
+    Expiry relies on the TTL index on ``feed_cache.expires_at``; reads also
+    check the timestamp because the TTL monitor only runs once a minute.
+    """
+
+    def __init__(self, db):
+        self.feeds = db["feed_cache"]
+
+    def get(self, key):
+        doc = self.feeds.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if not doc:
+            return None
+        return {"entries": doc["entries"], "total": doc["total"]}
+
+    def set(self, key, feed, ttl):
+        self.feeds.replace_one(
+            {"_id": key},
+            {
+                "entries": feed["entries"],
+                "total": feed["total"],
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl)
+            },
+            upsert=True
+        )
+
+    def delete(self, key):
+        self.feeds.delete_one({"_id": key})
+
+    def remove_entry(self, key, candidate_email):
+        self.feeds.update_one(
+            {"_id": key, "entries.email": candidate_email},
+            {"$pull": {"entries": {"email": candidate_email}}, "$inc": {"total": -1}}
+        )
+
+    def remove_entries(self, key, candidate_emails):
+        candidate_emails = list(candidate_emails)
+        swiped = {"$in": ["$$this.email", candidate_emails]}
+        # Both fields are computed from the document as it was, so total
+        # drops by exactly the number of entries removed.
+        self.feeds.update_one(
+            {"_id": key, "entries.email": {"$in": candidate_emails}},
+            [{"$set": {
+                "total": {"$subtract": ["$total", {"$size": {"$filter": {"input": "$entries", "cond": swiped}}}]},
+                "entries": {"$filter": {"input": "$entries", "cond": {"$eq": [swiped, False]}}},
+            }}]
+        )
+
+    def remove_from_feeds(self, keys, candidate_email):
+        self.feeds.update_many(
+            {"_id": {"$in": list(keys)}, "entries.email": candidate_email},
+            {"$pull": {"entries": {"email": candidate_email}}, "$inc": {"total": -1}}
+        )
+
+    def delete_containing(self, candidate_email):
+        self.feeds.delete_many({"entries.email": candidate_email})
+
+
+class FeedCache:
+    """Ranked recommendation feeds keyed by user email.
+
+    A feed is ``{"entries": [...], "total": n}`` where entries are the
+    top-ranked candidates with their score components, in ranking order.
+    """
+
+    def __init__(self, backend=None, ttl=300):
+        self.backend = backend or InMemoryFeedCacheBackend()
+        self.ttl = ttl
+
+    def init_app(self, app):
+        config = app.config
+        self.ttl = config.get("FEED_CACHE_TTL", self.ttl)
+        if config.get("FEED_CACHE_BACKEND") == "mongo":
+            self.backend = MongoFeedCacheBackend(app.mongo.db)
+        else:
+            self.backend = InMemoryFeedCacheBackend(config.get("FEED_CACHE_SIZE", 1000))
+        app.extensions["feed_cache"] = self
+
+    def get(self, email):
+        return self.backend.get(email)
+
+    def set(self, email, feed):
+        self.backend.set(email, feed, self.ttl)
+
+    def invalidate(self, *emails):
+        for email in emails:
+            self.backend.delete(email)
+
+    def remove_candidate(self, email, candidate_email):
+        self.backend.remove_entry(email, candidate_email)
+
+    def invalidate_candidate(self, candidate_email):
+        self.backend.delete_containing(candidate_email)
+
+    def swiped(self, swiper, target):
+        # Any swipe between two users hides each from the other's feed.
+        self.remove_candidate(swiper, target)
+        self.remove_candidate(target, swiper)
+
+    def swiped_many(self, swiper, targets):
+        """``swiped`` for every target, in two backend calls."""
+        if not targets:
+            return
+        self.backend.remove_entries(swiper, targets)
+        self.backend.remove_from_feeds(targets, swiper)
+
+
+feed_cache = FeedCache()
@@ -1,4 +1,5 @@
 from bson.objectid import ObjectId
+from services.feed_cache import feed_cache
 
 class InterestService:
     def __init__(self, db):
@@ -43,5 +44,6 @@ class InterestService:
             {"_id": user_id},
             {"$set": {"interests_completed": True}}
         )
+        feed_cache.invalidate(email)
 
         return {"success": True, "message": "Interests and partner preferences saved successfully."}, 200
@@ -1,58 +1,37 @@
-from math import radians, sin, cos, sqrt, atan2
+import numpy as np
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure
+from models.indexes import CASE_INSENSITIVE
+from utils.geo import parse_location
+from utils.user_ids import as_object_id, user_id_forms
+from services.feed_cache import feed_cache
+from services.feature_store import ProfileFeatureStore
+from services.similarity_index import similarity_index
+from services.scoring_engine import CandidatePool, ScoringEngine, normalize_hobbies
 
 class MatchAlgorithm:
-    def __init__(self, db):
+    MAX_PAGE_SIZE = 100
+    # Ranked candidates kept in the feed cache. Requests reaching past them
+    # (including ones without a limit) rank the whole pool uncached.
+    FEED_DEPTH = 500
+    CANDIDATE_USER_FIELDS = {"name": 1, "email": 1, "photo": 1}
+    CANDIDATE_DETAIL_FIELDS = {
+        "user_id": 1, "age": 1, "gender": 1, "religion": 1, "caste": 1,
+        "marital_status": 1, "location": 1, "profession": 1, "education": 1,
+        "caption": 1, "personality": 1, "hobbies": 1,
+        "location_coordinates": 1, "latitude": 1, "longitude": 1,
+        "location_geo": 1, "feature_vector": 1
+    }
+
+    def __init__(self, db, geo_retrieval=False):
+        self.geo_retrieval = geo_retrieval
         self.users = db["users"]
         self.details = db["user_details"]
         self.interests = db["user_interests"]
         self.swipes = db["swipes"]
-
-    def _cosine_similarity(self, vec1, vec2):
-        dot_product = sum(a*b for a,b in zip(vec1, vec2))
-        magnitude1 = sqrt(sum(a**2 for a in vec1))
-        magnitude2 = sqrt(sum(b**2 for b in vec2))
-        
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0
-        return dot_product / (magnitude1 * magnitude2)
-
-    def _text_to_vector(self, text):
-        words = text.lower().split()
-        word_counts = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        return word_counts
-
-    def _vectorize_features(self, user_data, candidate_data, user_interests, candidate_interests):
-        
-
-        features = {
-            'religion': str(user_data.get("religion", "")) if user_data else "",
-            'education': str(user_data.get("education", "")) if user_data else "",
-            'profession': str(user_data.get("profession", "")) if user_data else "",
-            'hobbies': " ".join(user_data.get("hobbies", [])) if user_data else "",
-            'personality': " ".join(user_data.get("personality", [])) if user_data else ""
-        }
-
-        candidate_features = {
-            'religion': str(candidate_data.get("religion", "")) if candidate_data else "",
-            'education': str(candidate_data.get("education", "")) if candidate_data else "",
-            'profession': str(candidate_data.get("profession", "")) if candidate_data else "",
-            'hobbies': " ".join(candidate_data.get("hobbies", [])) if candidate_data else "",
-            'personality': " ".join(candidate_data.get("personality", [])) if candidate_data else ""
-        }
-
-        user_text = " ".join(features.values())
-        candidate_text = " ".join(candidate_features.values())
-
-        user_vec = self._text_to_vector(user_text)
-        candidate_vec = self._text_to_vector(candidate_text)
-
-        all_words = set(user_vec.keys()).union(set(candidate_vec.keys()))
-        vec1 = [user_vec.get(word, 0) for word in all_words]
-        vec2 = [candidate_vec.get(word, 0) for word in all_words]
-
-        return vec1, vec2, features
+        self.feature_store = ProfileFeatureStore(db)
+        self.engine = ScoringEngine()
 
     def _parse_preferences(self, preference_value):
         if not preference_value:
@@ -68,91 +47,57 @@ class MatchAlgorithm:
         
         return set()
 
-    def _apply_rule_based_filtering(self, user_prefs, candidate_data,interests_data):
+    def _build_candidate_query(self, user_prefs, excluded_user_ids):
+        # Hard preference filters, evaluated by MongoDB with the
+        # CASE_INSENSITIVE collation since stored values keep their casing.
+        query = {"user_id": {"$nin": excluded_user_ids}}
+
         preferred_genders = self._parse_preferences(user_prefs.get("gender", "any"))
-        candidate_gender = str(candidate_data.get("gender", "")).lower()
-        
-        if "any" not in preferred_genders and candidate_gender not in preferred_genders:
-            return False, "Gender preference mismatch"
+        if "any" not in preferred_genders:
+            query["gender"] = {"$in": list(preferred_genders)}
 
         user_caste_prefs = self._parse_preferences(user_prefs.get("caste", "any"))
-        candidate_caste = str(candidate_data.get("caste", "")).lower()
-        
-        if "any" not in user_caste_prefs and candidate_caste:
-            if candidate_caste not in user_caste_prefs:
-                return False, f"Caste not in preferred: {user_caste_prefs}"
-
-        return True, "Passed all filters"
-
-    def _calculate_compatibility(self, user_detail, user_interests, candidate_detail, candidate_interests, distance_km):
-
-        score_breakdown = {
-            'total_score': 0,
-            'content_similarity': {'score': 0, 'matched_features': []},
-            'location': {'score': 0, 'distance_km': distance_km},
-            'age': {'score': 0, 'user_age': user_detail.get("age"), 'candidate_age': candidate_detail.get("age")},
-            'interests': {'score': 0, 'common_hobbies': [], 'user_hobbies': [], 'candidate_hobbies': []},
-            'filter_passed': True,
-            'rejection_reason': None
-        }
+        if "any" not in user_caste_prefs:
+            # Candidates who left caste empty are not filtered out.
+            query["caste"] = {"$in": list(user_caste_prefs) + ["", None]}
 
-        user_prefs = user_interests.get("looking_for", {})
-        passed, reason = self._apply_rule_based_filtering(user_prefs, candidate_detail, candidate_interests)
-        if not passed:
-            score_breakdown['filter_passed'] = False
-            score_breakdown['rejection_reason'] = reason
-            return score_breakdown
-
-        vec1, vec2, features = self._vectorize_features(user_detail, candidate_detail, user_interests, candidate_interests)
-        content_score = self._cosine_similarity(vec1, vec2) * 70
-        score_breakdown['content_similarity']['score'] = content_score
-        score_breakdown['content_similarity']['matched_features'] = [f"{k}: {v}" for k, v in features.items() if v]
-
-        location_score = 0
-        if distance_km <= 50:
-            location_score = 10
-        elif distance_km <= 1000:
-            location_score = 10 * (1 - (distance_km - 50) / 950)
-        score_breakdown['location']['score'] = location_score
-
-        age_score = 0
-        try:
-            candidate_age = candidate_detail.get("age")
-            age_pref = user_prefs.get("age_group", "18-99")
-            min_age, max_age = map(int, age_pref.split('-')) if '-' in age_pref else (18, 99)
-
-            if min_age <= candidate_age <= max_age:
-                age_score = 10
-                score_breakdown['age']['match'] = f"Within preferred range ({min_age}-{max_age})"
-            else:
-                score_breakdown['age']['match'] = f"Outside preferred range ({min_age}-{max_age})"
-        except Exception as e:
-            score_breakdown['age']['error'] = str(e)
-        score_breakdown['age']['score'] = age_score
-
-        interest_score = 0
-        user_hobbies = set(str(h).lower() for h in user_detail.get("hobbies", []))
-        candidate_hobbies = set(str(h).lower() for h in candidate_detail.get("hobbies", []))
-        score_breakdown['interests']['user_hobbies'] = list(user_hobbies)
-        score_breakdown['interests']['candidate_hobbies'] = list(candidate_hobbies)
-
-        if user_hobbies and candidate_hobbies:
-            common = user_hobbies & candidate_hobbies
-            interest_score = 10 * len(common) / len(user_hobbies)
-            score_breakdown['interests']['common_hobbies'] = list(common)
-            score_breakdown['interests']['match_percentage'] = f"{len(common)/len(user_hobbies)*100:.1f}%"
+        age_range = self._preferred_age_range(user_prefs)
+        if age_range:
+            query["age"] = {"$gte": age_range[0], "$lte": age_range[1]}
 
-        score_breakdown['interests']['score'] = interest_score
+        return query
 
-        total_score = content_score + location_score + age_score + interest_score
-        score_breakdown['total_score'] = round(min(100, max(0, total_score)))
-
-        return score_breakdown
+    def _preferred_age_range(self, user_prefs):
+        # Only an age_group the user actually chose is a hard filter; the
+        # (18, 99) scoring default must not drop anyone from the feed.
+        age_pref = user_prefs.get("age_group")
+        if not isinstance(age_pref, str) or '-' not in age_pref:
+            return None
+        try:
+            min_age, max_age = map(int, age_pref.split('-'))
+        except ValueError:
+            return None
+        return (min_age, max_age) if min_age <= max_age else None
 
+    def _parse_age_range(self, user_prefs):
+        age_pref = user_prefs.get("age_group", "18-99")
+        try:
+            return tuple(map(int, age_pref.split('-'))) if '-' in age_pref else (18, 99)
+        except (AttributeError, TypeError, ValueError):
+            return None
 
     def _get_document(self, collection, user_id):
         return collection.find_one({"user_id": user_id}) or collection.find_one({"user_id": str(user_id)})
 
+    def _get_documents(self, collection, user_ids, projection=None):
+        lookup_ids = user_id_forms(user_ids)
+        documents = {}
+        if not lookup_ids:
+            return documents
+        for doc in collection.find({"user_id": {"$in": lookup_ids}}, projection):
+            documents.setdefault(str(doc["user_id"]), doc)
+        return documents
+
     def _get_interests_list(self, interests_doc, details_doc):
         interests = []
         def extend_clean(data):
@@ -179,38 +124,8 @@ class MatchAlgorithm:
 
         return list(set(filter(None, interests)))
 
-    def _haversine(self, lat1, lon1, lat2, lon2):
-        R = 6371.0
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
-
     def _get_location(self, user_detail):
-        if not user_detail:
-            return None
-        if "location_coordinates" in user_detail:
-            coords = user_detail["location_coordinates"]
-            if isinstance(coords, dict):
-                try:
-                    lat = float(coords.get("lat", 0))
-                    lng = float(coords.get("lng", 0))
-                    if lat != 0 and lng != 0:
-                        return {"lat": lat, "lng": lng}
-                except (ValueError, TypeError):
-                    pass
-        try:
-            lat = user_detail.get("latitude")
-            lng = user_detail.get("longitude")
-            if lat is not None and lng is not None:
-                return {
-                    "lat": float(lat),
-                    "lng": float(lng)
-                }
-        except (ValueError, TypeError):
-            pass
-        return None
+        return parse_location(user_detail)
 
     def _build_photo_url(self, request, raw_photo):
         base_url = request.host_url.rstrip('/')
@@ -220,36 +135,23 @@ class MatchAlgorithm:
             return raw_photo
         return f"{base_url}/default-profile.jpg"
 
-    def _process_candidate(self, request, candidate, partner_gender_pref, liked_emails, liked_by_emails, user_detail, user_interests_list, user_location):
+    def _build_profile(self, request, candidate, detail, entry, features, age_range, user_hobbies):
         email = candidate.get("email")
-        if email in liked_emails or email in liked_by_emails:
-            return None
-
-        detail = self._get_document(self.details, candidate["_id"])
-        if not detail:
-            return None
-
-        candidate_interests = self._get_document(self.interests, candidate["_id"])
-        candidate_location = self._get_location(detail)
-
-        distance = None
-        if user_location and candidate_location:
-            distance = self._haversine(
-                user_location["lat"], user_location["lng"],
-                candidate_location["lat"], candidate_location["lng"]
-            )
-
-        compatibility = self._calculate_compatibility(
-        user_detail,
-        self._get_document(self.interests, user_detail.get("user_id") or user_detail.get("_id")),
-        detail,
-        candidate_interests,
-        distance or 0
-    )
+        distance = entry["distance_km"]
+        weights = self.engine.weights
 
+        if age_range:
+            in_range = entry["age"] > 0
+            age_details = f"{'Within' if in_range else 'Outside'} preferred range ({age_range[0]}-{age_range[1]})"
+        else:
+            age_details = "Not specified"
 
-        if not compatibility['filter_passed']:
-            return None
+        candidate_hobbies = normalize_hobbies(detail.get("hobbies"))
+        common_hobbies = user_hobbies & candidate_hobbies
+        if user_hobbies and candidate_hobbies:
+            match_percentage = f"{len(common_hobbies)/len(user_hobbies)*100:.1f}%"
+        else:
+            match_percentage = "0%"
 
         return {
             "id": str(candidate["_id"]),
@@ -267,32 +169,133 @@ class MatchAlgorithm:
             "personality": detail.get("personality", []),
             "hobbies": detail.get("hobbies", []),
             "images": [self._build_photo_url(request, candidate.get("photo"))],
-            "is_match": email in liked_by_emails,
+            "is_match": entry["is_match"],
             "distance_km": round(distance, 2) if distance is not None else None,
-            "compatibility_score": compatibility['total_score'],
+            "compatibility_score": entry["total_score"],
             "score_breakdown": {  # Detailed matching reasons
                 'content_similarityyy': {
-                    'score': f"{(compatibility['content_similarity']['score']):.1f}/70",
-                    'matched_features': compatibility['content_similarity']['matched_features']
+                    'score': f"{entry['content']:.1f}/{weights['content']}",
+                    'matched_features': [f"{k}: {v}" for k, v in features.items() if v]
                 },
                'location': {
-                'score': f"{round(compatibility['location']['score'])}/10",  
+                'score': f"{round(entry['location'])}/{weights['location']}",
                 'distance': f"{distance:.1f} km" if distance else "Unknown"
                 },
                 'age': {
-                    'score': f"{round(compatibility['age']['score'])}/10",  
-                    'details': compatibility['age'].get('match', 'Not specified')
+                    'score': f"{round(entry['age'])}/{weights['age']}",
+                    'details': age_details
                 },
                 'interests': {
-                    'score': f"{round(compatibility['interests']['score'])}/10", 
-                    'common_hobbies': compatibility['interests']['common_hobbies'],
-                    'match_percentage': compatibility['interests'].get('match_percentage', '0%')
+                    'score': f"{round(entry['interests'])}/{weights['interests']}",
+                    'common_hobbies': list(common_hobbies),
+                    'match_percentage': match_percentage
                 },
-               
+
             }
         }
 
-    def get_profiles(self, request, current_email):
+    def _rank_candidates(self, current_email, user_detail, user_prefs, depth):
+        liked_emails, liked_by_emails = self._get_swipe_data(current_email)
+
+        excluded_ids = user_id_forms(
+            u["_id"] for u in self.users.find({"email": {"$in": list(liked_emails | liked_by_emails | {current_email})}}, {"_id": 1})
+        )
+
+        query = self._build_candidate_query(user_prefs, excluded_ids)
+        user_location = self._get_location(user_detail)
+        if self.geo_retrieval and user_location:
+            details = self._find_nearby(query, user_location, self._search_radius_km(user_prefs))
+        else:
+            details = list(self.details.find(query, self.CANDIDATE_DETAIL_FIELDS, collation=CASE_INSENSITIVE))
+        user_ids = [as_object_id(d["user_id"]) for d in details]
+        emails = {
+            u["_id"]: u["email"]
+            for u in self.users.find({"_id": {"$in": [i for i in user_ids if i]}}, {"email": 1})
+        }
+
+        eligible, eligible_details = [], []
+        for user_id, detail in zip(user_ids, details):
+            if user_id in emails:
+                eligible.append({"_id": user_id, "email": emails[user_id]})
+                eligible_details.append(detail)
+
+        pool = CandidatePool(
+            eligible_details,
+            [self.feature_store.get_vector(d) for d in eligible_details],
+            [self._get_location(d) for d in eligible_details],
+            distances=[d["distance_km"] for d in eligible_details] if self.geo_retrieval and user_location else None
+        )
+        scores = self.engine.score(
+            pool,
+            self.feature_store.get_vector(user_detail),
+            user_location,
+            self._parse_age_range(user_prefs),
+            normalize_hobbies(user_detail.get("hobbies"))
+        )
+
+        entries = []
+        ids = [str(c["_id"]) for c in eligible]
+        for i in self._top_k(scores["total_score"], ids, pool.size if depth is None else depth):
+            distance = scores["distance_km"][i]
+            email = eligible[i]["email"]
+            entries.append({
+                "id": str(eligible[i]["_id"]),
+                "email": email,
+                "is_match": email in liked_by_emails,
+                "total_score": int(scores["total_score"][i]),
+                "content": float(scores["content"][i]),
+                "location": float(scores["location"][i]),
+                "age": float(scores["age"][i]),
+                "interests": float(scores["interests"][i]),
+                "distance_km": None if np.isnan(distance) else float(distance),
+            })
+        return {"entries": entries, "total": pool.size}
+
+    def _search_radius_km(self, user_prefs):
+        # Beyond max_location_km the location score is already zero, so only
+        # users open to long distance need candidates from further away.
+        long_distance = str(user_prefs.get("long_distance") or "").strip().lower()
+        return None if long_distance == "yes" else self.engine.max_location_km
+
+    def _find_nearby(self, query, user_location, radius_km):
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [user_location["lng"], user_location["lat"]]},
+            "key": "location_geo",
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "spherical": True,
+            "query": query,
+        }
+        if radius_km is not None:
+            geo_near["maxDistance"] = radius_km * 1000
+        try:
+            nearby = list(self.details.aggregate(
+                [{"$geoNear": geo_near}, {"$project": dict(self.CANDIDATE_DETAIL_FIELDS, distance_km=1)}],
+                collation=CASE_INSENSITIVE
+            ))
+        except OperationFailure as e:
+            # Typically the 2dsphere index has not been built yet.
+            print(" $geoNear failed, scanning candidates instead:", str(e))
+            details = self.details.find(query, self.CANDIDATE_DETAIL_FIELDS, collation=CASE_INSENSITIVE)
+            return [dict(d, distance_km=None) for d in details]
+
+        # Profiles without location_geo never appear in $geoNear, so fetch
+        # them separately. Their distance is left to the scoring engine, which
+        # computes it from whatever coordinates they do have.
+        unlocated = self.details.find(
+            dict(query, location_geo={"$exists": False}),
+            self.CANDIDATE_DETAIL_FIELDS,
+            collation=CASE_INSENSITIVE
+        )
+        return nearby + [dict(d, distance_km=None) for d in unlocated]
+
+    def _feed_covers(self, feed, end):
+        entries = feed["entries"]
+        if end is None:
+            return len(entries) >= feed["total"]
+        return len(entries) >= min(end, feed["total"])
+
+    def get_profiles(self, request, current_email, limit=None, cursor=None):
         user = self.users.find_one({"email": current_email})
         if not user:
             return {"profiles": []}
@@ -302,27 +305,146 @@ class MatchAlgorithm:
             return {"profiles": []}
 
         user_interests = self._get_document(self.interests, user["_id"])
-        user_location = self._get_location(user_detail)
-        liked_emails, liked_by_emails = self._get_swipe_data(current_email)
-        partner_gender_pref = self._get_gender_preference(user_interests or {})
-
-        profiles = []
-        for candidate in self.users.find({"email": {"$ne": current_email}}):
-            profile = self._process_candidate(
-                request, candidate, partner_gender_pref,
-                liked_emails, liked_by_emails,
-                user_detail, user_interests, user_location
+        user_prefs = (user_interests or {}).get("looking_for", {})
+
+        after = self._decode_cursor(cursor)
+
+        feed = feed_cache.get(current_email)
+        if feed is None:
+            feed = self._rank_candidates(current_email, user_detail, user_prefs, self.FEED_DEPTH)
+            feed_cache.set(current_email, feed)
+
+        # The cursor names the last candidate already shown rather than an
+        # offset, so swipes removing entries from the cached feed do not
+        # shift later pages.
+        start = self._position_after(feed["entries"], after)
+        end = None if limit is None else start + limit
+        if not self._feed_covers(feed, end):
+            # Past the cached depth: rank the whole pool for this request only.
+            feed = self._rank_candidates(current_email, user_detail, user_prefs, None)
+            start = self._position_after(feed["entries"], after)
+            end = None if limit is None else start + limit
+
+        total = feed["total"]
+        end = total if end is None else min(end, total)
+        page = feed["entries"][start:end]
+
+        page_ids = [ObjectId(e["id"]) for e in page]
+        users = {str(u["_id"]): u for u in self.users.find({"_id": {"$in": page_ids}}, self.CANDIDATE_USER_FIELDS)}
+        details = self._get_documents(self.details, page_ids, self.CANDIDATE_DETAIL_FIELDS)
+
+        features = self.feature_store.profile_features(user_detail)
+        age_range = self._parse_age_range(user_prefs)
+        user_hobbies = normalize_hobbies(user_detail.get("hobbies"))
+        profiles = [
+            self._build_profile(
+                request, users[e["id"]], details[e["id"]], e,
+                features, age_range, user_hobbies
             )
-            if profile:
-                profiles.append(profile)
-
-        profiles.sort(key=lambda x: -x["compatibility_score"])
+            for e in page if e["id"] in users and e["id"] in details
+        ]
 
         return {
             "profiles": profiles,
+            "total": total,
+            "next_cursor": self._encode_cursor(page[-1]) if page and end < total else None,
             "logged_in_user": self._build_user_profile(request, user, user_detail, user_interests)
         }
 
+    # Feeds are ordered by total_score descending, then user id ascending, and
+    # a page cursor is the "<total_score>_<id>" of the last entry returned.
+
+    def _encode_cursor(self, entry):
+        return f"{entry['total_score']}_{entry['id']}"
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        score, _, user_id = cursor.rpartition('_')
+        try:
+            score = int(score)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        if not ObjectId.is_valid(user_id):
+            raise ValueError("Invalid cursor")
+        return (-score, user_id)
+
+    def _position_after(self, entries, after):
+        # Index of the first entry ranked after the cursor, whether or not the
+        # cursor's own entry is still in the feed.
+        if after is None:
+            return 0
+        return next((i for i, e in enumerate(entries) if (-e["total_score"], e["id"]) > after), len(entries))
+
+    def _top_k(self, total_scores, ids, k):
+        # Rank by score, breaking ties by user id so that the order matches
+        # the page cursors and does not depend on the pool's order.
+        size = len(total_scores)
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        id_rank = np.argsort(np.argsort(np.array(ids)))
+        keys = total_scores.astype(np.int64) * size + (size - 1 - id_rank)
+        if k < size:
+            candidates = np.argpartition(-keys, k - 1)[:k]
+        else:
+            candidates = np.arange(size)
+        return candidates[np.argsort(-keys[candidates])]
+
+    def _ensure_similarity_index(self):
+        if similarity_index.built and not similarity_index.sync_due():
+            return
+        projection = {"user_id": 1, "feature_vector": 1, **{f: 1 for f in self.feature_store.FEATURE_FIELDS}}
+        started = datetime.utcnow()
+        if not similarity_index.built:
+            similarity_index.build({
+                str(d["user_id"]): self.feature_store.get_vector(d)
+                for d in self.details.find({}, projection)
+            }, synced_at=started)
+            return
+
+        # Pick up profiles other workers changed. The look-back margin covers
+        # clock skew between workers; applying a vector twice is harmless.
+        since = similarity_index.synced_at - timedelta(seconds=similarity_index.sync_interval)
+        similarity_index.sync({
+            str(d["user_id"]): self.feature_store.get_vector(d)
+            for d in self.details.find({"feature_updated_at": {"$gte": since}}, projection)
+        }, synced_at=started)
+
+    def get_similar_profiles_for_profile(self, request, profile_email, limit=10):
+        user = self.users.find_one({"email": profile_email}, {"_id": 1})
+        if not user:
+            return None
+        detail = self._get_document(self.details, user["_id"])
+        if not detail:
+            return None
+
+        self._ensure_similarity_index()
+        neighbours = similarity_index.query(
+            self.feature_store.get_vector(detail), k=limit, exclude={str(user["_id"])}
+        )
+
+        ids = [i for i in (as_object_id(user_id) for user_id, _ in neighbours) if i]
+        users = {str(u["_id"]): u for u in self.users.find({"_id": {"$in": ids}}, self.CANDIDATE_USER_FIELDS)}
+        details = self._get_documents(self.details, ids, self.CANDIDATE_DETAIL_FIELDS)
+
+        profiles = []
+        for user_id, similarity in neighbours:
+            candidate, candidate_detail = users.get(user_id), details.get(user_id)
+            if not candidate or not candidate_detail:
+                continue
+            profiles.append({
+                "id": user_id,
+                "name": candidate.get("name", "Unknown"),
+                "email": candidate.get("email", ""),
+                "images": [self._build_photo_url(request, candidate.get("photo"))],
+                "location": candidate_detail.get("location", ""),
+                "age": candidate_detail.get("age", ""),
+                "profession": candidate_detail.get("profession", ""),
+                "education": candidate_detail.get("education", ""),
+                "similarity_score": round(similarity, 3)
+            })
+        return profiles
+
     def _get_gender_preference(self, user_interests):
         if not user_interests:
             return "any"
@@ -341,16 +463,14 @@ class MatchAlgorithm:
         return "any"
 
     def _get_swipe_data(self, current_email):
-        swiped_by_user = {s["target"] for s in self.swipes.find({"swiper": current_email})}
-        swiped_on_user = {s["swiper"] for s in self.swipes.find({"target": current_email})}
+        swiped_by_user = {s["target"] for s in self.swipes.find({"swiper": current_email}, {"target": 1})}
+        swiped_on_user = {s["swiper"] for s in self.swipes.find({"target": current_email}, {"swiper": 1})}
         return swiped_by_user, swiped_on_user
 
     def _build_user_profile(self, request, user, user_detail, interests):
         looking_for = {}
-        if user_detail:
-            raw_interests = self._get_document(self.interests, user["_id"])
-            if raw_interests and isinstance(raw_interests.get("looking_for"), dict):
-                looking_for = raw_interests["looking_for"]
+        if user_detail and interests and isinstance(interests.get("looking_for"), dict):
+            looking_for = interests["looking_for"]
 
         return {
             "name": user.get("name"),
@@ -1,31 +1,37 @@
 from bson.objectid import ObjectId
 from datetime import datetime
-
-from math import radians, sin, cos, sqrt, atan2
+from types import SimpleNamespace
+
+import heapq
+from collections import Counter
+from math import sqrt
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from models.indexes import CASE_INSENSITIVE
+from services.feed_cache import feed_cache
+from services.notification_push import notification_push
+from utils.conversation import get_conversation_id
+from utils.cursor import cursor_query, cursor_sort, encode_cursor
+from utils.user_ids import as_object_id, user_id_forms
 
 class   MatchService:
+    SIMILARITY_FIELDS = {
+        "user_id": 1, "gender": 1, "caste": 1, "religion": 1, "hobbies": 1,
+        "age": 1, "profession": 1, "education": 1, "location": 1
+    }
+
+    CARD_USER_FIELDS = {"name": 1, "email": 1, "photo": 1}
+    CARD_DETAIL_FIELDS = {
+        "user_id": 1, "age": 1, "location": 1, "profession": 1, "education": 1,
+        "hobbies": 1, "caption": 1, "compatibility_score": 1
+    }
+
     def __init__(self, db):
         self.users = db["users"]
         self.details = db["user_details"]
         self.swipes = db["swipes"]
         self.notifications = db["notifications"]
         self.matches = db["matches"]
-    def _cosine_similarity(self, vec1, vec2):
-        dot_product = sum(a*b for a,b in zip(vec1, vec2))
-        magnitude1 = sqrt(sum(a**2 for a in vec1))
-        magnitude2 = sqrt(sum(b**2 for b in vec2))
-        
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0
-        return dot_product / (magnitude1 * magnitude2)
-
-    def _text_to_vector(self, text):
-        words = text.lower().split()
-        word_counts = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        return word_counts
-
     def build_photo_url(self, request, raw_photo):
         base_url = request.host_url.rstrip('/')
         if raw_photo:
@@ -34,6 +40,26 @@ class   MatchService:
             return raw_photo
         return f"{base_url}/default-profile.jpg"
 
+    def _load_profile_cards(self, request, user_filter):
+        # One query for users and one for their details, keyed by email.
+        # "detail" is None for users who have not completed registration.
+        users = list(self.users.find(user_filter, self.CARD_USER_FIELDS))
+        details = {d["user_id"]: d for d in self.details.find(
+            {"user_id": {"$in": [u["_id"] for u in users]}},
+            self.CARD_DETAIL_FIELDS
+        )}
+        return {
+            user["email"]: {
+                "id": str(user["_id"]),
+                "name": user.get("name"),
+                "email": user["email"],
+                "photo": user.get("photo"),
+                "image": self.build_photo_url(request, user.get("photo")),
+                "detail": details.get(user["_id"]),
+            }
+            for user in users
+        }
+
     def get_sent_requests(self, email, request):
         liked = self.swipes.find({"swiper": email, "liked": True})
         liked_emails = [s["target"] for s in liked]
@@ -44,18 +70,17 @@ class   MatchService:
         pending_requests = set(liked_emails) - set(reverse_emails)
 
         profiles = []
-        for user in self.users.find({"email": {"$in": list(pending_requests)}}):
-            detail = self.details.find_one({"user_id": user["_id"]})
+        for card in self._load_profile_cards(request, {"email": {"$in": list(pending_requests)}}).values():
+            detail = card["detail"]
             if not detail:
                 continue
-            photo_url = self.build_photo_url(request, user.get("photo"))
             profiles.append({
-                "id": str(user["_id"]),
-                "name": user.get("name"),
-                "email": user.get("email"),
+                "id": card["id"],
+                "name": card["name"],
+                "email": card["email"],
                 "age": detail.get("age"),
                 "location": detail.get("location"),
-                "photos": [photo_url],
+                "photos": [card["image"]],
             })
 
         return profiles
@@ -91,78 +116,225 @@ class   MatchService:
         return profiles
 
 
-    def swipe(self, swiper, target, liked):
+    def swipe(self, swiper, target, liked, request=None):
+        # Round trips: the swipe upsert, the reverse-like lookup (likes only),
+        # the match upsert/delete when there is one to make or undo, and one
+        # bulk_write for all notification changes.
+        # With `request`, new notifications are also pushed over Socket.IO.
+        now = datetime.utcnow()
         self.swipes.update_one(
             {"swiper": swiper, "target": target},
-            {"$set": {"liked": liked, "timestamp": datetime.utcnow()}},
+            {"$set": {"liked": liked, "timestamp": now}},
             upsert=True
         )
+        feed_cache.swiped(swiper, target)
 
-        self.notifications.delete_many({"to": swiper, "from": target, "type": "request"})
+        notes = [DeleteMany({"to": swiper, "from": target, "type": "request"})]
+        inserted, affected = [], {swiper}
+        result = {"match": False}
 
         if liked:
-            reverse = self.swipes.find_one({"swiper": target, "target": swiper, "liked": True})
-            match = self.matches.find_one({"users": {"$all": [swiper, target]}})
-
-            if reverse and not match:
-                match_doc = {
-                    "users": sorted([swiper, target]),
-                    "timestamp": datetime.utcnow()
-                }
-                match_id = self.matches.insert_one(match_doc).inserted_id
-
-                for user1, user2 in [(swiper, target), (target, swiper)]:
-                    self.notifications.insert_one({
-                        "to": user1,
-                        "from": user2,
-                        "type": "match",
-                        "message": f"You matched with {user2}!",
-                        "read": False,
-                        "timestamp": datetime.utcnow()
-                    })
-
-                return {"match": True, "match_id": str(match_id)}
+            reverse = self.swipes.find_one({"swiper": target, "target": swiper, "liked": True}, {"_id": 1})
+            created = None
+            if reverse:
+                # Two mutual likes racing each other both get here; the unique
+                # pair_key index lets exactly one of them create the match.
+                try:
+                    created = self.matches.update_one(
+                        {"pair_key": get_conversation_id(swiper, target)},
+                        {"$setOnInsert": {"users": sorted([swiper, target]), "timestamp": now}},
+                        upsert=True
+                    ).upserted_id
+                except DuplicateKeyError:
+                    created = None
+
+            if created:
+                inserted += self._match_notes(swiper, target, now)
+                result = {"match": True, "match_id": str(created)}
+            else:
+                inserted.append(self._request_note(swiper, target, now))
+
+        elif self.matches.delete_one({"pair_key": get_conversation_id(swiper, target)}).deleted_count:
+            notes.append(self._unmatch_notes(swiper, target))
+            affected.add(target)
+
+        self.notifications.bulk_write(notes + [InsertOne(n) for n in inserted], ordered=True)
+        if request is not None:
+            self._publish(request, inserted, affected)
+        return result
+
+    def _match_notes(self, swiper, target, now):
+        return [
+            {
+                "_id": ObjectId(),
+                "to": user1,
+                "from": user2,
+                "type": "match",
+                "message": f"You matched with {user2}!",
+                "read": False,
+                "timestamp": now
+            }
+            for user1, user2 in [(swiper, target), (target, swiper)]
+        ]
+
+    def _request_note(self, swiper, target, now):
+        return {
+            "_id": ObjectId(),
+            "to": target,
+            "from": swiper,
+            "type": "request",
+            "message": f"{swiper} liked your profile!",
+            "read": False,
+            "timestamp": now
+        }
+
+    def _unmatch_notes(self, swiper, target):
+        return DeleteMany({
+            "type": "match",
+            "$or": [
+                {"to": swiper, "from": target},
+                {"to": target, "from": swiper}
+            ]
+        })
 
+    def swipe_batch(self, swiper, swipes, request=None):
+        """Apply ``[{"target_email", "liked"}, ...]`` in order for one swiper.
+
+        The result is the same as calling ``swipe`` for each item in turn,
+        but takes at most five round trips however long the batch is: the
+        swipe upserts, the reverse likes, the existing matches, the match
+        changes and the notification changes.
+        Returns one result per item, in order.
+        """
+        now = datetime.utcnow()
+        results = [None] * len(swipes)
+        valid = []
+        for i, item in enumerate(swipes):
+            target = item.get("target_email") if isinstance(item, dict) else None
+            liked = item.get("liked") if isinstance(item, dict) else None
+            # Only real booleans: the string "false" would count as a like.
+            if not isinstance(target, str) or not target or not isinstance(liked, bool) or target == swiper:
+                results[i] = {"target_email": target, "error": "Invalid swipe"}
             else:
-                self.notifications.insert_one({
-                    "to": target,
-                    "from": swiper,
-                    "type": "request",
-                    "message": f"{swiper} liked your profile!",
-                    "read": False,
-                    "timestamp": datetime.utcnow()
-                })
-
-        else:
-            match = self.matches.find_one({"users": {"$all": [swiper, target]}})
-            if match:
-                self.matches.delete_one({"_id": match["_id"]})
-                self.notifications.delete_many({
-                    "type": "match",
-                    "$or": [
-                        {"to": swiper, "from": target},
-                        {"to": target, "from": swiper}
-                    ]
-                })
-
-        return {"match": False}
-
-    def get_notifications(self, email, request):
-        notes = list(self.notifications.find({
+                valid.append((i, target, liked))
+
+        if not valid:
+            return results
+
+        self.swipes.bulk_write([
+            UpdateOne(
+                {"swiper": swiper, "target": target},
+                {"$set": {"liked": liked, "timestamp": now}},
+                upsert=True
+            )
+            for _, target, liked in valid
+        ], ordered=True)
+
+        targets = list({target for _, target, _ in valid})
+        liked_back = {
+            s["swiper"] for s in self.swipes.find(
+                {"swiper": {"$in": targets}, "target": swiper, "liked": True}, {"swiper": 1}
+            )
+        }
+        matched = {
+            m["pair_key"] for m in self.matches.find(
+                {"pair_key": {"$in": [get_conversation_id(swiper, t) for t in targets]}}, {"pair_key": 1}
+            )
+        }
+
+        # Walk the batch in order against the match state it implies, so a
+        # target swiped more than once ends up as if swiped one at a time.
+        match_ops, plan = [], []
+        for i, target, liked in valid:
+            key = get_conversation_id(swiper, target)
+            if liked and target in liked_back and key not in matched:
+                # The _id is chosen here so the upserts that actually
+                # inserted can be recognised in the bulk result.
+                match_id = ObjectId()
+                matched.add(key)
+                plan.append((i, target, "match", match_id))
+                match_ops.append(UpdateOne(
+                    {"pair_key": key},
+                    {"$setOnInsert": {"_id": match_id, "users": sorted([swiper, target]), "timestamp": now}},
+                    upsert=True
+                ))
+            elif liked:
+                plan.append((i, target, "request", None))
+            elif key in matched:
+                matched.discard(key)
+                plan.append((i, target, "unmatch", None))
+                match_ops.append(DeleteOne({"pair_key": key}))
+            else:
+                plan.append((i, target, None, None))
+
+        created, start = set(), 0
+        while start < len(match_ops):
+            try:
+                created.update(self.matches.bulk_write(match_ops[start:], ordered=True).upserted_ids.values())
+                break
+            except BulkWriteError as e:
+                # A concurrent swipe created this match first; an ordered bulk
+                # stops there, so carry on with the operations after it.
+                error = e.details["writeErrors"][0]
+                if error.get("code") != 11000:
+                    raise
+                created.update(u["_id"] for u in e.details.get("upserted", []))
+                start += error["index"] + 1
+
+        notes, inserted, affected = [], [], {swiper}
+        for i, target, action, match_id in plan:
+            notes.append(DeleteMany({"to": swiper, "from": target, "type": "request"}))
+            results[i] = {"target_email": target, "match": False}
+            new = []
+            if action == "match" and match_id in created:
+                new = self._match_notes(swiper, target, now)
+                results[i] = {"target_email": target, "match": True, "match_id": str(match_id)}
+            elif action in ("match", "request"):
+                new = [self._request_note(swiper, target, now)]
+            elif action == "unmatch":
+                notes.append(self._unmatch_notes(swiper, target))
+                affected.add(target)
+            notes += [InsertOne(n) for n in new]
+            inserted += new
+        self.notifications.bulk_write(notes, ordered=True)
+
+        feed_cache.swiped_many(swiper, targets)
+
+        if request is not None:
+            # Later swipes in the batch may have removed earlier notifications.
+            self._publish(request, inserted, affected, recheck=True)
+        return results
+
+    def get_notifications(self, email, request, before=None, after=None, limit=50):
+        # `before` and `after` are decoded cursors (see utils.cursor).
+        query = {
             "to": email,
-            "type": {"$in": ["request", "match"]}
-        }).sort("timestamp", -1).limit(50))
+            "type": {"$in": ["request", "match"]},
+            **cursor_query(before, after)
+        }
+
+        # `after` alone resumes from the newest notification a client has, so
+        # take the oldest ones past it; the page is always returned newest first.
+        direction = 1 if after and not before else -1
+        notes = list(self.notifications.find(query).sort(cursor_sort(direction)).limit(limit))
+        if direction == 1:
+            notes.reverse()
+        return self._enrich_notifications(request, notes)
+
+    def _enrich_notifications(self, request, notes):
+        senders = self._load_profile_cards(request, {"email": {"$in": list({n["from"] for n in notes})}})
 
         for n in notes:
+            n["cursor"] = encode_cursor(n)
             n["_id"] = str(n["_id"])
             n["timestamp"] = n["timestamp"].isoformat()
-            sender = self.users.find_one({"email": n["from"]})
+            sender = senders.get(n["from"])
             if sender:
-                n["sender_name"] = sender.get("name")
-                n["sender_id"] = str(sender["_id"])  
-                n["sender_image"] = self.build_photo_url(request, sender.get("photo"))
+                n["sender_name"] = sender["name"]
+                n["sender_id"] = sender["id"]
+                n["sender_image"] = sender["image"]
 
-                detail = self.details.find_one({"user_id": sender["_id"]})
+                detail = sender["detail"]
                 if detail:
                     n["sender_age"] = detail.get("age")
                     n["sender_location"] = detail.get("location")
@@ -173,6 +345,40 @@ class   MatchService:
                     n["compatibility_score"] = detail.get("compatibility_score", "0")
         return notes
 
+    def notification_counts(self, emails):
+        counts = {email: {"requests": 0, "unread": 0} for email in emails}
+        for row in self.notifications.aggregate([
+            {"$match": {"to": {"$in": list(emails)}, "type": {"$in": ["request", "match"]}}},
+            {"$group": {
+                "_id": "$to",
+                "requests": {"$sum": {"$cond": [{"$eq": ["$type", "request"]}, 1, 0]}},
+                "unread": {"$sum": {"$cond": [{"$eq": ["$read", False]}, 1, 0]}},
+            }}
+        ]):
+            counts[row["_id"]] = {"requests": row["requests"], "unread": row["unread"]}
+        return counts
+
+    def _publish(self, request, inserted, affected, recheck=False):
+        # Enriching the notes and counting take three more queries, so they
+        # run after the swipe has responded. Only the host URL is needed from
+        # the request, which will be gone by then.
+        if not notification_push.enabled:
+            return
+        host = SimpleNamespace(host_url=request.host_url)
+        notification_push.defer(self._push, host, [dict(n) for n in inserted], set(affected), recheck)
+
+    def _push(self, request, inserted, affected, recheck):
+        try:
+            if recheck and inserted:
+                remaining = {n["_id"] for n in self.notifications.find(
+                    {"_id": {"$in": [n["_id"] for n in inserted]}}, {"_id": 1}
+                )}
+                inserted = [n for n in inserted if n["_id"] in remaining]
+            notification_push.push(self._enrich_notifications(request, inserted))
+            notification_push.counts(self.notification_counts(affected | {n["to"] for n in inserted}))
+        except Exception as e:
+            print(" Error pushing notifications:", str(e))
+
     def mark_read(self, notification_id):
         return self.notifications.update_one(
             {"_id": ObjectId(notification_id)},
@@ -192,6 +398,10 @@ class   MatchService:
                 {"$set": {"liked": False, "timestamp": datetime.utcnow()}},
                 upsert=True
             )
+            feed_cache.swiped(notification["from"], notification["to"])
+
+        if notification_push.enabled:
+            notification_push.counts(self.notification_counts({notification["to"]}))
         return True
 
     def get_mutual_matches(self, email, request):
@@ -199,16 +409,14 @@ class   MatchService:
         matched_emails = [u for m in matched_docs for u in m["users"] if u != email]
 
         profiles = []
-        for user in self.users.find({"email": {"$in": matched_emails}}):
-            detail = self.details.find_one({"user_id": user["_id"]})
-            if not detail:
+        for card in self._load_profile_cards(request, {"email": {"$in": matched_emails}}).values():
+            if not card["detail"]:
                 continue
-            photo_url = self.build_photo_url(request, user.get("photo"))
             profiles.append({
-                "name": user.get("name"),
-                "email": user.get("email"),
-                "images": [photo_url],
-                # "location": detail.get("location"),
+                "name": card["name"],
+                "email": card["email"],
+                "images": [card["image"]],
+                # "location": card["detail"].get("location"),
             })
         return profiles
 
@@ -225,97 +433,92 @@ class   MatchService:
             "type": "request"
         })
 
+        if swipe_result.deleted_count:
+            # Both users can show up in each other's feed again.
+            feed_cache.invalidate(swiper_email, target_email)
+            if notification_push.enabled:
+                notification_push.counts(self.notification_counts({target_email}))
+
         return swipe_result.deleted_count > 0
     
 
 
+    def _profile_vector(self, detail):
+        text = " ".join([
+            (detail.get("gender") or "").lower(),
+            (detail.get("caste") or "").lower(),
+            (detail.get("religion") or "").lower(),
+            " ".join(h.lower() for h in detail.get("hobbies") or []),
+            str(detail.get("age", 0)),
+            (detail.get("profession") or "").lower(),
+            (detail.get("education") or "").lower()
+        ])
+        return Counter(text.split())
+
     def get_similar_to_liked_users(self, email, request):
-        current_user = self.users.find_one({"email": email})
+        current_user = self.users.find_one({"email": email}, {"_id": 1})
         if not current_user:
             return []
-        
-        current_detail = self.details.find_one({"user_id": current_user["_id"]})
-        if not current_detail:
-            return []
-
-        swiped_users = list(self.swipes.find({"swiper": email, "liked": True}))
-        swiped_emails = [entry["target"] for entry in swiped_users]
 
+        swiped_emails = [s["target"] for s in self.swipes.find({"swiper": email, "liked": True}, {"target": 1})]
         if not swiped_emails:
             return []
 
-        liked_users = list(self.users.find({"email": {"$in": swiped_emails}}))
-        liked_user_ids = [user["_id"] for user in liked_users]
-        liked_details = list(self.details.find({"user_id": {"$in": liked_user_ids}}))
-
+        liked_user_ids = [u["_id"] for u in self.users.find({"email": {"$in": swiped_emails}}, {"_id": 1})]
+        liked_details = list(self.details.find({"user_id": {"$in": user_id_forms(liked_user_ids)}}, self.SIMILARITY_FIELDS))
         if not liked_details:
             return []
 
-        def get_most_common(vectors, key):
-            values = [v.get(key, "").lower() for v in vectors if v.get(key)]
-            if not values:
-                return None
-            return max(set(values), key=values.count)
+        def get_most_common(details, key):
+            values = Counter((d.get(key) or "").lower() for d in details if d.get(key))
+            return values.most_common(1)[0][0] if values else None
+
+        # The summed word counts point the same way as the mean of the liked
+        # profiles, so one centroid vector stands in for all of them.
+        centroid = Counter()
+        for detail in liked_details:
+            centroid.update(self._profile_vector(detail))
+        centroid_norm = sqrt(sum(c * c for c in centroid.values()))
 
+        query = {"user_id": {"$nin": user_id_forms(liked_user_ids + [current_user["_id"]])}}
         preferred_gender = get_most_common(liked_details, "gender")
         preferred_caste = get_most_common(liked_details, "caste")
-
-        def create_profile_text(detail):
-            return " ".join([
-                detail.get("gender", "").lower(),
-                detail.get("caste", "").lower(),
-                detail.get("religion", "").lower(),
-                " ".join(h.lower() for h in detail.get("hobbies", [])),
-                str(detail.get("age", 0)),
-                detail.get("profession", "").lower(),
-                detail.get("education", "").lower()
-            ])
-
-        liked_text = " ".join(create_profile_text(d) for d in liked_details)
-
-        candidate_users = list(self.users.find({
-            "email": {"$nin": swiped_emails + [email]}
-        }))
-
+        if preferred_gender:
+            query["gender"] = preferred_gender
+        if preferred_caste:
+            query["caste"] = preferred_caste
+
+        def scored_candidates():
+            for detail in self.details.find(query, self.SIMILARITY_FIELDS, collation=CASE_INSENSITIVE):
+                vector = self._profile_vector(detail)
+                norm = sqrt(sum(c * c for c in vector.values()))
+                if not norm or not centroid_norm:
+                    continue
+                similarity = sum(centroid[w] * c for w, c in vector.items()) / (norm * centroid_norm)
+                if similarity > 0.3:
+                    yield similarity, detail
+
+        top = heapq.nlargest(5, scored_candidates(), key=lambda item: item[0])
+
+        top_ids = [i for i in (as_object_id(d["user_id"]) for _, d in top) if i]
+        cards = {
+            card["id"]: card
+            for card in self._load_profile_cards(request, {"_id": {"$in": top_ids}}).values()
+        }
         candidates = []
-        for user in candidate_users:
-            detail = self.details.find_one({"user_id": user["_id"]})
-            if not detail:
-                continue
-
-            # Rule-based filtering
-            candidate_gender = detail.get("gender", "").lower()
-            candidate_caste = detail.get("caste", "").lower()
-
-            if preferred_gender and candidate_gender != preferred_gender:
-                continue
-
-            if preferred_caste and candidate_caste != preferred_caste:
+        for similarity, detail in top:
+            card = cards.get(str(detail["user_id"]))
+            if not card:
                 continue
-
-            candidate_text = create_profile_text(detail)
-
-            liked_vec = self._text_to_vector(liked_text)
-            candidate_vec = self._text_to_vector(candidate_text)
-            
-            all_words = set(liked_vec.keys()).union(set(candidate_vec.keys()))
-            vec1 = [liked_vec.get(word, 0) for word in all_words]
-            vec2 = [candidate_vec.get(word, 0) for word in all_words]
-            
-            similarity = self._cosine_similarity(vec1, vec2)
-
-            if similarity > 0.3:
-                photo = user.get("photo")
-                candidates.append({
-                    "id": str(user["_id"]),
-                    "name": user.get("name", "Unknown"),
-                    "email": user.get("email", ""),
-                    "images": [self.build_photo_url(request, photo)] if photo else [],
-                    "location": detail.get("location", ""),
-                    "age": detail.get("age", ""),
-                    "profession": detail.get("profession", ""),
-                    "education": detail.get("education", ""),
-                    "similarity_score": round(similarity, 3)
-                })
-
-        return sorted(candidates, key=lambda x: x["similarity_score"], reverse=True)[:5]
\ No newline at end of file
+            candidates.append({
+                "id": card["id"],
+                "name": card["name"] or "Unknown",
+                "email": card["email"],
+                "images": [card["image"]] if card["photo"] else [],
+                "location": detail.get("location", ""),
+                "age": detail.get("age", ""),
+                "profession": detail.get("profession", ""),
+                "education": detail.get("education", ""),
+                "similarity_score": round(similarity, 3)
+            })
+        return candidates
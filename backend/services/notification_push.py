@@ -0,0 +1,36 @@
+from services.presence import user_room
+
+class NotificationPush:
+    """Pushes notifications to the recipients' personal Socket.IO rooms.
+
+    Does nothing until ``init_app`` has been called with the Socket.IO
+    server, so services can call it unconditionally (e.g. from seeders).
+    """
+
+    def __init__(self):
+        self._socketio = None
+
+    @property
+    def enabled(self):
+        return self._socketio is not None
+
+    def init_app(self, app, socketio):
+        self._socketio = socketio
+        app.extensions["notification_push"] = self
+
+    def defer(self, fn, *args):
+        """Run ``fn(*args)`` as a Socket.IO background task, after the caller returns."""
+        self._socketio.start_background_task(fn, *args)
+
+    def push(self, notes):
+        """Send each enriched notification to its recipient."""
+        for note in notes:
+            self._socketio.emit('notification', note, room=user_room(note["to"]))
+
+    def counts(self, counts):
+        """Send ``{email: {"requests": n, "unread": m}}`` to each user."""
+        for email, count in counts.items():
+            self._socketio.emit('notification_count', count, room=user_room(email))
+
+
+notification_push = NotificationPush()
@@ -0,0 +1,233 @@
+import os
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+def user_room(email):
+    """Socket.IO room every connection of ``email`` joins."""
+    return f"user:{email}"
+
+
+class InMemoryPresenceBackend:
+    """Presence for a single worker: email -> set of connected sids."""
+
+    def __init__(self):
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def connect(self, email, sid):
+        with self._lock:
+            sids = self._connections.setdefault(email, set())
+            sids.add(sid)
+            return len(sids) == 1
+
+    def disconnect(self, email, sid):
+        with self._lock:
+            sids = self._connections.get(email)
+            if sids is None:
+                return False
+            sids.discard(sid)
+            if sids:
+                return False
+            del self._connections[email]
+            return True
+
+    def is_online(self, email):
+        with self._lock:
+            return email in self._connections
+
+    def online(self):
+        with self._lock:
+            return list(self._connections)
+
+    def online_among(self, emails):
+        with self._lock:
+            return [email for email in emails if email in self._connections]
+
+    def heartbeat(self):
+        return []
+
+
+class MongoPresenceBackend:
+    """Presence shared by every worker.
+
+    One document per online user in ``presence`` holds the connections as
+    ``{"worker", "sid"}`` entries. ``$addToSet``/``$pull`` on that single
+    document are atomic, so exactly one connect reports the user coming
+    online and exactly one disconnect reports them going offline, however
+    the tabs are spread over workers. Workers record a heartbeat in
+    ``presence_workers``; connections owned by a worker that stopped beating
+    (e.g. it crashed) are pruned by the surviving workers.
+    """
+
+    def __init__(self, db, worker_id=None, stale_after=90):
+        self.presence = db["presence"]
+        self.workers = db["presence_workers"]
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stale_after = stale_after
+
+    def _connection(self, sid):
+        return {"worker": self.worker_id, "sid": sid}
+
+    def connect(self, email, sid):
+        doc = self.presence.find_one_and_update(
+            {"_id": email},
+            {"$addToSet": {"sids": self._connection(sid)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return len(doc["sids"]) == 1
+
+    def disconnect(self, email, sid):
+        doc = self.presence.find_one_and_update(
+            {"_id": email},
+            {"$pull": {"sids": self._connection(sid)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None or doc["sids"]:
+            return False
+        # Only the disconnect that actually removes the document reports it,
+        # and a connect that raced in between keeps the user online.
+        return self.presence.delete_one({"_id": email, "sids": {"$size": 0}}).deleted_count == 1
+
+    def is_online(self, email):
+        return self.presence.count_documents({"_id": email}, limit=1) > 0
+
+    def online(self):
+        return [doc["_id"] for doc in self.presence.find({}, {"_id": 1})]
+
+    def online_among(self, emails):
+        return [doc["_id"] for doc in self.presence.find({"_id": {"$in": list(emails)}}, {"_id": 1})]
+
+    def heartbeat(self):
+        """Record this worker as alive and prune connections of dead workers.
+
+        Returns the emails that went offline as a result.
+        """
+        now = datetime.utcnow()
+        self.workers.update_one({"_id": self.worker_id}, {"$set": {"seen_at": now}}, upsert=True)
+
+        offline = []
+        cutoff = now - timedelta(seconds=self.stale_after)
+        for worker in self.workers.find({"seen_at": {"$lt": cutoff}}, {"_id": 1}):
+            for doc in self.presence.find({"sids.worker": worker["_id"]}, {"_id": 1}):
+                self.presence.update_one({"_id": doc["_id"]}, {"$pull": {"sids": {"worker": worker["_id"]}}})
+                if self.presence.delete_one({"_id": doc["_id"], "sids": {"$size": 0}}).deleted_count:
+                    offline.append(doc["_id"])
+            self.workers.delete_one({"_id": worker["_id"]})
+        return offline
+
+
+class Presence:
+    """Which users have at least one open socket, across tabs and workers."""
+
+    def __init__(self, backend=None, heartbeat_interval=30):
+        self.backend = backend or InMemoryPresenceBackend()
+        self.heartbeat_interval = heartbeat_interval
+
+    def init_app(self, app):
+        config = app.config
+        self.heartbeat_interval = config.get("PRESENCE_HEARTBEAT_INTERVAL", self.heartbeat_interval)
+        if config.get("PRESENCE_BACKEND") == "mongo":
+            self.backend = MongoPresenceBackend(
+                app.mongo.db,
+                worker_id=config.get("PRESENCE_WORKER_ID"),
+                stale_after=3 * self.heartbeat_interval
+            )
+        else:
+            self.backend = InMemoryPresenceBackend()
+        app.extensions["presence"] = self
+
+    def connect(self, email, sid):
+        """Register a connection; True if this is the user's first one."""
+        return self.backend.connect(email, sid)
+
+    def disconnect(self, email, sid):
+        """Drop a connection; True if it was the user's last one."""
+        return self.backend.disconnect(email, sid)
+
+    def is_online(self, email):
+        return self.backend.is_online(email)
+
+    def online(self):
+        return self.backend.online()
+
+    def online_among(self, emails):
+        return self.backend.online_among(emails)
+
+    def heartbeat(self):
+        return self.backend.heartbeat()
+
+
+class PresenceDeltas:
+    """Tells each user's matches when they come online or go offline.
+
+    Changes are collected for ``window`` seconds and then sent as at most one
+    ``user_online`` and one ``user_offline`` event (lists of emails) to each
+    affected match's personal room. A user who drops and reconnects inside
+    the window produces no event at all.
+    """
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self._socketio = None
+        self._db = None
+        self._pending = {}      # email -> (online before the window, online now)
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app, socketio):
+        self.window = app.config.get("PRESENCE_COALESCE_WINDOW", self.window)
+        self._socketio = socketio
+        self._db = app.mongo.db
+        app.extensions["presence_deltas"] = self
+
+    def changed(self, email, online):
+        # Seeders and scripts never call init_app; there is no one to tell.
+        if self._socketio is None:
+            return
+        with self._lock:
+            before = self._pending[email][0] if email in self._pending else not online
+            self._pending[email] = (before, online)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self._socketio.sleep(self.window)
+        try:
+            self.flush()
+        except Exception as e:
+            print(" Presence update failed:", str(e))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+
+        changes = {email: now for email, (before, now) in pending.items() if before != now}
+        if not changes:
+            return
+
+        deltas = defaultdict(lambda: {"online": set(), "offline": set()})
+        for match in self._db.matches.find({"users": {"$in": list(changes)}}, {"users": 1}):
+            for email in match["users"]:
+                if email not in changes:
+                    continue
+                state = "online" if changes[email] else "offline"
+                for other in match["users"]:
+                    if other != email:
+                        deltas[other][state].add(email)
+
+        for recipient, delta in deltas.items():
+            if delta["online"]:
+                self._socketio.emit('user_online', sorted(delta["online"]), room=user_room(recipient))
+            if delta["offline"]:
+                self._socketio.emit('user_offline', sorted(delta["offline"]), room=user_room(recipient))
+
+
+presence = Presence()
+presence_deltas = PresenceDeltas()
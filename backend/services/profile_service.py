@@ -3,6 +3,14 @@ from datetime import datetime
 from bson.objectid import ObjectId
 from flask import current_app, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
+from services.feature_store import ProfileFeatureStore
+from services.feed_cache import feed_cache
+from services.similarity_index import similarity_index
+from utils.age import parse_age
+from utils.geo import refresh_location
+
+MIN_AGE = 18
+
 
 class ProfileService:
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
@@ -81,6 +89,12 @@ class ProfileService:
         if not user:
             return jsonify({"error": "User not found"}), 404
 
+        if "age" in data:
+            age = parse_age(data["age"])
+            if age is None or age < MIN_AGE:
+                return jsonify({"error": f"Age must be a whole number, {MIN_AGE} or older"}), 400
+            data = dict(data, age=age)
+
         if "name" in data:
             mongo.db.users.update_one({"_id": user_obj_id}, {"$set": {"name": data["name"]}})
 
@@ -111,6 +125,13 @@ class ProfileService:
                 {"$set": details_update},
                 upsert=True
             )
+            feature_store = ProfileFeatureStore(mongo.db)
+            if any(field in details_update for field in feature_store.FEATURE_FIELDS):
+                vector = feature_store.refresh(user_obj_id)
+                if vector:
+                    similarity_index.upsert(str(user_obj_id), vector)
+            if "latitude" in details_update or "longitude" in details_update:
+                refresh_location(mongo.db.user_details, user_obj_id)
 
         if "lookingFor" in data:
             mongo.db.user_interests.update_one(
@@ -119,6 +140,12 @@ class ProfileService:
                 upsert=True
             )
 
+        if details_update or "lookingFor" in data:
+            feed_cache.invalidate(user["email"])
+        if details_update:
+            # Scores other users computed against this profile are stale too.
+            feed_cache.invalidate_candidate(user["email"])
+
         return self.get_profile(str(user_obj_id))
 
     def upload_photo(self, user_id, file):
@@ -1,13 +1,18 @@
 import email
+from datetime import datetime
 from werkzeug.security import generate_password_hash
 from models.user_model import UserModel
 from models.user_detail_model import UserDetailModel
+from services.feature_store import ProfileFeatureStore
+from services.similarity_index import similarity_index
+from utils.geo import geo_point
 import re
 
 class RegisterService:
     def __init__(self, db):
         self.user_model = UserModel(db)
         self.detail_model = UserDetailModel(db)
+        self.feature_store = ProfileFeatureStore(db)
 
     def register_user(self, data):
         name = data.get('name')
@@ -94,8 +99,14 @@ class RegisterService:
                 'hobbies': details.get('hobbies', []),
                 'caption': details.get('caption', '')
             }
+            details_doc['feature_vector'] = self.feature_store.build_vector(details_doc)
+            details_doc['feature_updated_at'] = datetime.utcnow()
+            location_geo = geo_point(details_doc)
+            if location_geo:
+                details_doc['location_geo'] = location_geo
 
             self.detail_model.create_details(details_doc)
+            similarity_index.upsert(str(user_id), details_doc['feature_vector'])
 
             return {'success': True, 'message': 'User registration successful'}, 200
 
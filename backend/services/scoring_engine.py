@@ -0,0 +1,146 @@
+import numpy as np
+
+# Maximum points each component contributes to total_score.
+SCORE_WEIGHTS = {
+    "content": 70,
+    "location": 10,
+    "age": 10,
+    "interests": 10,
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def normalize_hobbies(hobbies):
+    if not hobbies:
+        return set()
+    if isinstance(hobbies, str):
+        hobbies = [hobbies]
+    return {str(h).lower() for h in hobbies if h}
+
+
+class CandidatePool:
+    """Columnar view of a candidate set for batch scoring.
+
+    Feature vectors and hobbies are kept as coordinate lists (row, column,
+    value) so the whole pool can be scored with ``np.bincount`` without
+    materializing a dense candidates x vocabulary matrix.
+    """
+
+    def __init__(self, details, vectors, locations, distances=None):
+        self.details = details
+        self.size = len(details)
+
+        self.token_index = {}
+        rows, cols, weights = [], [], []
+        for row, vector in enumerate(vectors):
+            for token, weight in zip(vector["tokens"], vector["weights"]):
+                rows.append(row)
+                cols.append(self.token_index.setdefault(token, len(self.token_index)))
+                weights.append(weight)
+        self.feature_rows = np.array(rows, dtype=np.int64)
+        self.feature_cols = np.array(cols, dtype=np.int64)
+        self.feature_weights = np.array(weights, dtype=np.float64)
+
+        self.lat = np.array([loc["lat"] if loc else np.nan for loc in locations], dtype=np.float64)
+        self.lng = np.array([loc["lng"] if loc else np.nan for loc in locations], dtype=np.float64)
+        # Distances already computed by the database (e.g. $geoNear), if any.
+        self.distances = None
+        if distances is not None:
+            self.distances = np.array([np.nan if d is None else d for d in distances], dtype=np.float64)
+
+        self.ages = np.array([self._numeric_age(d.get("age")) for d in details], dtype=np.float64)
+
+        self.hobby_index = {}
+        hobby_rows, hobby_cols = [], []
+        for row, detail in enumerate(details):
+            for hobby in normalize_hobbies(detail.get("hobbies")):
+                hobby_rows.append(row)
+                hobby_cols.append(self.hobby_index.setdefault(hobby, len(self.hobby_index)))
+        self.hobby_rows = np.array(hobby_rows, dtype=np.int64)
+        self.hobby_cols = np.array(hobby_cols, dtype=np.int64)
+
+    @staticmethod
+    def _numeric_age(age):
+        if isinstance(age, (int, float)) and not isinstance(age, bool):
+            return float(age)
+        return np.nan
+
+
+class ScoringEngine:
+    def __init__(self, weights=None, full_location_km=50, max_location_km=1000):
+        self.weights = dict(SCORE_WEIGHTS, **(weights or {}))
+        self.full_location_km = full_location_km
+        self.max_location_km = max_location_km
+
+    def _content_scores(self, user_vector, pool):
+        lookup = np.zeros(len(pool.token_index), dtype=np.float64)
+        for token, weight in zip(user_vector["tokens"], user_vector["weights"]):
+            col = pool.token_index.get(token)
+            if col is not None:
+                lookup[col] = weight
+        similarity = np.bincount(
+            pool.feature_rows,
+            weights=pool.feature_weights * lookup[pool.feature_cols],
+            minlength=pool.size
+        )
+        return similarity * self.weights["content"]
+
+    def _distances(self, user_location, pool):
+        if not user_location:
+            return np.full(pool.size, np.nan) if pool.distances is None else pool.distances
+        lat1, lng1 = np.radians(user_location["lat"]), np.radians(user_location["lng"])
+        lat2, lng2 = np.radians(pool.lat), np.radians(pool.lng)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        haversine = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        if pool.distances is None:
+            return haversine
+        # Candidates the database could not place (no location_geo yet) fall
+        # back to the distance computed from their stored coordinates.
+        return np.where(np.isnan(pool.distances), haversine, pool.distances)
+
+    def _location_scores(self, distances):
+        # Unknown distances are scored as if the candidate were next door,
+        # matching the behaviour of the original per-candidate scorer.
+        distances = np.nan_to_num(distances, nan=0.0)
+        span = self.max_location_km - self.full_location_km
+        scores = 1 - (distances - self.full_location_km) / span
+        scores = np.where(distances <= self.full_location_km, 1.0, scores)
+        scores = np.where(distances <= self.max_location_km, scores, 0.0)
+        return scores * self.weights["location"]
+
+    def _age_scores(self, age_range, pool):
+        if not age_range:
+            return np.zeros(pool.size)
+        min_age, max_age = age_range
+        with np.errstate(invalid="ignore"):
+            in_range = (pool.ages >= min_age) & (pool.ages <= max_age)
+        return in_range * float(self.weights["age"])
+
+    def _interest_scores(self, user_hobbies, pool):
+        if not user_hobbies:
+            return np.zeros(pool.size)
+        mask = np.zeros(len(pool.hobby_index), dtype=np.float64)
+        for hobby in user_hobbies:
+            col = pool.hobby_index.get(hobby)
+            if col is not None:
+                mask[col] = 1.0
+        common = np.bincount(pool.hobby_rows, weights=mask[pool.hobby_cols], minlength=pool.size)
+        return common / len(user_hobbies) * self.weights["interests"]
+
+    def score(self, pool, user_vector, user_location, age_range, user_hobbies):
+        distances = self._distances(user_location, pool)
+        content = self._content_scores(user_vector, pool)
+        location = self._location_scores(distances)
+        age = self._age_scores(age_range, pool)
+        interests = self._interest_scores(user_hobbies, pool)
+
+        total = content + location + age + interests
+        return {
+            "content": content,
+            "location": location,
+            "age": age,
+            "interests": interests,
+            "distance_km": distances,
+            "total_score": np.rint(np.clip(total, 0, 100)).astype(np.int64),
+        }
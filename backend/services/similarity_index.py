@@ -0,0 +1,123 @@
+import threading
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+
+class SimilarityIndex:
+    """In-memory nearest-neighbour index over profile feature vectors.
+
+    Vectors are already L2-normalized, so cosine similarity is a sparse
+    matrix-vector product. Profile changes go into a small overlay that is
+    scored separately and folded into the matrix once it grows past
+    ``compact_threshold``.
+
+    Each worker process holds its own copy, and ``upsert`` only reaches the
+    copy of the process that saved the profile. The others catch up through
+    ``sync``: ``sync_due`` turns true every ``sync_interval`` seconds and the
+    caller then passes in the vectors changed since ``synced_at``.
+    """
+
+    def __init__(self, compact_threshold=1000, sync_interval=30):
+        self.compact_threshold = compact_threshold
+        self.sync_interval = sync_interval
+        self.synced_at = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._built = False
+        self._vocab = {}
+        self._vectors = {}      # user_id -> (columns, weights)
+        self._row_ids = []      # matrix row -> user_id
+        self._matrix = csr_matrix((0, 0), dtype=np.float32)
+        self._overlay = set()   # user_ids whose matrix row is missing or stale
+
+    @property
+    def built(self):
+        return self._built
+
+    def _encode(self, vector):
+        cols = np.array([self._vocab.setdefault(t, len(self._vocab)) for t in vector["tokens"]], dtype=np.int64)
+        return cols, np.array(vector["weights"], dtype=np.float32)
+
+    def _compact(self):
+        self._row_ids = list(self._vectors)
+        indptr, indices, data = [0], [], []
+        for user_id in self._row_ids:
+            cols, weights = self._vectors[user_id]
+            indices.append(cols)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(cols))
+        self._matrix = csr_matrix(
+            (
+                np.concatenate(data) if data else np.array([], dtype=np.float32),
+                np.concatenate(indices) if indices else np.array([], dtype=np.int64),
+                np.array(indptr, dtype=np.int64)
+            ),
+            shape=(len(self._row_ids), len(self._vocab))
+        )
+        self._overlay = set()
+
+    def build(self, vectors, synced_at=None):
+        """Replace the index contents with ``{user_id: feature_vector}``."""
+        with self._lock:
+            self._vocab = {}
+            self._vectors = {user_id: self._encode(v) for user_id, v in vectors.items()}
+            self._compact()
+            self._built = True
+            self.synced_at = synced_at
+            self._checked_at = time.monotonic()
+
+    def sync_due(self):
+        return self._built and time.monotonic() - self._checked_at >= self.sync_interval
+
+    def sync(self, vectors, synced_at):
+        """Apply ``{user_id: feature_vector}`` changed since ``synced_at``."""
+        with self._lock:
+            for user_id, vector in vectors.items():
+                self.upsert(user_id, vector)
+            self.synced_at = synced_at
+            self._checked_at = time.monotonic()
+
+    def upsert(self, user_id, vector):
+        with self._lock:
+            if not self._built:
+                return
+            self._vectors[user_id] = self._encode(vector)
+            self._overlay.add(user_id)
+            if len(self._overlay) > self.compact_threshold:
+                self._compact()
+
+    def remove(self, user_id):
+        with self._lock:
+            if self._vectors.pop(user_id, None) is not None:
+                self._overlay.add(user_id)
+
+    def query(self, vector, k=10, exclude=()):
+        """Return up to ``k`` ``(user_id, similarity)`` pairs, best first."""
+        with self._lock:
+            query = np.zeros(len(self._vocab), dtype=np.float32)
+            for token, weight in zip(vector["tokens"], vector["weights"]):
+                col = self._vocab.get(token)
+                if col is not None:
+                    query[col] = weight
+
+            scores = {}
+            if self._matrix.shape[0]:
+                matrix_scores = self._matrix @ query[:self._matrix.shape[1]]
+                skip = self._overlay | set(exclude)
+                limit = min(len(matrix_scores), k + len(skip))
+                top = np.argpartition(-matrix_scores, limit - 1)[:limit] if limit < len(matrix_scores) else np.arange(len(matrix_scores))
+                for row in top:
+                    user_id = self._row_ids[row]
+                    if user_id not in skip:
+                        scores[user_id] = float(matrix_scores[row])
+
+            for user_id in self._overlay:
+                if user_id in self._vectors and user_id not in exclude:
+                    cols, weights = self._vectors[user_id]
+                    scores[user_id] = float(np.dot(query[cols], weights))
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        return [(user_id, score) for user_id, score in ranked[:k] if score > 0]
+
+
+similarity_index = SimilarityIndex()
@@ -2,15 +2,20 @@ from flask_socketio import SocketIO, join_room, emit
 from flask import current_app, request
 from datetime import datetime
 from bson import ObjectId
-from utils.encryption import encrypt_message, decrypt_message
+from utils.encryption import encrypt_message
+from utils.conversation import get_conversation_id
+from utils.cursor import decode_cursor
+from services.chat_service import ChatService
+from services.chat_writer import chat_writer
+from services.presence import presence, presence_deltas, user_room
+from services.notification_push import notification_push
+from services.match_service import MatchService
 
 socketio = SocketIO(cors_allowed_origins="*", async_mode='eventlet')
-online_users = set()
+chat_service = ChatService()
 
 def get_room_id(user1, user2):
-    if not user1 or not user2:
-        return None
-    return '_'.join(sorted([user1, user2]))
+    return get_conversation_id(user1, user2)
 
 def serialize_objectid(obj):
     if isinstance(obj, list):
@@ -21,22 +26,65 @@ def serialize_objectid(obj):
         return str(obj)
     return obj
 
+def init_socketio(app, **options):
+    # With a message queue (e.g. redis://...) every worker relays emits and
+    # room broadcasts to the others, so the chat tier can run multiple
+    # processes. Leave it unset for a single process.
+    options.setdefault("message_queue", app.config.get("SOCKETIO_MESSAGE_QUEUE"))
+    socketio.init_app(app, **options)
+    chat_writer.init_app(app, socketio)
+    presence_deltas.init_app(app, socketio)
+    notification_push.init_app(app, socketio)
+    if app.config.get("PRESENCE_BACKEND") == "mongo":
+        socketio.start_background_task(_presence_heartbeat)
+
+def _presence_heartbeat():
+    while True:
+        try:
+            for email in presence.heartbeat():
+                presence_deltas.changed(email, False)
+        except Exception as e:
+            print(" Presence heartbeat failed:", str(e))
+        socketio.sleep(presence.heartbeat_interval)
+
+def send_missed_notifications(email, after):
+    # Clients reconnect with the cursor of the newest notification they
+    # hold as `after` and get everything newer, then live pushes take over.
+    try:
+        after = decode_cursor(after)
+    except ValueError:
+        return
+    if not after:
+        return
+    service = MatchService(current_app.mongo.db)
+    emit('notifications', service.get_notifications(email, request, after=after, limit=100))
+    emit('notification_count', service.notification_counts({email})[email])
+
+def _tracks_presence():
+    # The navbar's notification socket connects with presence=0 so a user
+    # only counts as online while the chat is open.
+    return request.args.get('presence') != '0'
+
 def register_socketio_events(app):
     @socketio.on('connect')
     def handle_connect():
         user_email = request.args.get('email')
         if user_email:
-            online_users.add(user_email)
             print(f" {user_email} connected")
-            emit('online_users', list(online_users), broadcast=True)
+            join_room(user_room(user_email))
+            # Only the first open connection changes anyone's view; clients
+            # load the current state from /chat/presence.
+            if _tracks_presence() and presence.connect(user_email, request.sid):
+                presence_deltas.changed(user_email, True)
+            send_missed_notifications(user_email, request.args.get('after'))
 
     @socketio.on('disconnect')
     def handle_disconnect():
         user_email = request.args.get('email')
         if user_email:
-            online_users.discard(user_email)
             print(f" {user_email} disconnected")
-            emit('online_users', list(online_users), broadcast=True)
+            if _tracks_presence() and presence.disconnect(user_email, request.sid):
+                presence_deltas.changed(user_email, False)
 
     @socketio.on('join_room')
     def on_join(data):
@@ -57,11 +105,33 @@ def register_socketio_events(app):
             return
 
         room = get_room_id(data['sender'], data['receiver'])
-        
+
+        if chat_writer.enabled:
+            # Deliver first; the writer encrypts and stores the message later
+            # and emits message_persisted with this _id once it is written.
+            chat = {
+                "_id": ObjectId(),
+                "conversation_id": room,
+                "sender": data['sender'],
+                "receiver": data['receiver'],
+                "message": data['message'],
+                "timestamp": datetime.utcnow()
+            }
+            emit('receive_message', {
+                "sender": chat["sender"],
+                "receiver": chat["receiver"],
+                "message": data['message'],
+                "timestamp": chat["timestamp"].isoformat(),
+                "_id": str(chat["_id"]),
+            }, room=room)
+            chat_writer.submit(chat)
+            return
+
         # Encrypt the message before saving
         encrypted_msg = encrypt_message(data['message'])
 
         chat = {
+            "conversation_id": room,
             "sender": data['sender'],
             "receiver": data['receiver'],
             "message": encrypted_msg,   # store encrypted
@@ -72,16 +142,14 @@ def register_socketio_events(app):
             db = current_app.mongo.db
             result = db.chat_messages.insert_one(chat)
             chat['_id'] = str(result.inserted_id)  
+            chat_service.record_message(db, chat)
         except Exception as e:
             print(" Error saving message to DB:", str(e))
 
-        # Decrypt message before emitting back to users
-        decrypted_msg = decrypt_message(chat['message'])
-
         emit('receive_message', {
             "sender": chat["sender"],
             "receiver": chat["receiver"],
-            "message": decrypted_msg,    # send decrypted message
+            "message": data['message'],    # plaintext already in hand, no need to decrypt
             "timestamp": chat["timestamp"].isoformat(),
             "_id": chat.get('_id'),
         }, room=room)
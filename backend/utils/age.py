@@ -0,0 +1,29 @@
+def parse_age(value):
+    """Age as an int, or None if ``value`` is not a whole number of years."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def normalize_ages(details):
+    """Store every ``user_details.age`` saved as a string of digits as an int.
+
+    The feed filters age with a numeric range, which never matches strings.
+    Returns ``(updated, invalid)``: invalid values (e.g. an age group such
+    as ``"25-30"``) are left as they are for someone to fix by hand.
+    """
+    updated, invalid = 0, []
+    for detail in details.find({"age": {"$type": "string"}}, {"age": 1}):
+        age = parse_age(detail["age"])
+        if age is None:
+            invalid.append(detail["_id"])
+            continue
+        details.update_one({"_id": detail["_id"]}, {"$set": {"age": age}})
+        updated += 1
+    return updated, invalid
@@ -0,0 +1,109 @@
+from utils.cursor import parse_timestamp
+
+
+def get_conversation_id(user1, user2):
+    """Canonical id for the chat between two users (also their Socket.IO room)."""
+    if not user1 or not user2:
+        return None
+    return '_'.join(sorted([user1, user2]))
+
+
+def backfill_conversation_ids(chat_messages):
+    # Same ordering as sorted() above: both compare the emails codepoint by codepoint.
+    result = chat_messages.update_many(
+        {"conversation_id": {"$exists": False}},
+        [{"$set": {"conversation_id": {"$cond": [
+            {"$lt": ["$sender", "$receiver"]},
+            {"$concat": ["$sender", "_", "$receiver"]},
+            {"$concat": ["$receiver", "_", "$sender"]}
+        ]}}}]
+    )
+    return result.modified_count
+
+
+def rebuild_conversations(db, missing_only=False):
+    """Recreate conversation summaries from chat_messages and read_receipts.
+
+    With ``missing_only`` only conversations that have no summary yet are
+    rebuilt. Returns the number of summaries written.
+    """
+    existing = set(db.conversations.distinct("_id")) if missing_only else set()
+    last_messages = db.chat_messages.aggregate([
+        {"$match": {"conversation_id": {"$exists": True}}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": "$conversation_id",
+            "last_message": {"$last": "$message"},
+            "last_sender": {"$last": "$sender"},
+            "last_receiver": {"$last": "$receiver"},
+            "last_timestamp": {"$last": "$timestamp"},
+        }},
+    ], allowDiskUse=True)
+
+    rebuilt = 0
+    for last in last_messages:
+        if last["_id"] in existing:
+            continue
+        participants = sorted([last["last_sender"], last["last_receiver"]])
+        unread = {}
+        for key, user in enumerate(participants):
+            receipt = db.read_receipts.find_one({"user": user, "chat_with": participants[1 - key]})
+            query = {"conversation_id": last["_id"], "receiver": user}
+            if receipt:
+                try:
+                    query["timestamp"] = {"$gt": parse_timestamp(receipt.get("last_read"))}
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            unread[str(key)] = db.chat_messages.count_documents(query)
+
+        db.conversations.replace_one({"_id": last["_id"]}, {
+            "participants": participants,
+            "last_message": last["last_message"],
+            "last_sender": last["last_sender"],
+            "last_timestamp": last["last_timestamp"],
+            "unread": unread,
+        }, upsert=True)
+        rebuilt += 1
+    return rebuilt
+
+
+def backfill_conversations(conversations):
+    """Build summaries for conversations that predate them.
+
+    Every new message updates its summary, so once this has run there is
+    nothing left to do; it is skipped when the summaries' index already
+    exists, i.e. on every start after the first.
+    """
+    if "participants_last_timestamp" in conversations.index_information():
+        return 0
+    return rebuild_conversations(conversations.database, missing_only=True)
+
+
+def backfill_pair_keys(matches):
+    """Add pair_key (the pair's get_conversation_id) to matches created before it existed.
+
+    Duplicate matches for the same pair (left behind by concurrent swipes)
+    would block the unique index, so all but the oldest are removed. Once the
+    unique index exists there can be none, so unless matches were just keyed
+    the dedupe is skipped. Returns ``(updated, removed)``.
+    """
+    updated = matches.update_many(
+        {"pair_key": {"$exists": False}},
+        [{"$set": {"pair_key": {"$cond": [
+            {"$lt": [{"$arrayElemAt": ["$users", 0]}, {"$arrayElemAt": ["$users", 1]}]},
+            {"$concat": [{"$arrayElemAt": ["$users", 0]}, "_", {"$arrayElemAt": ["$users", 1]}]},
+            {"$concat": [{"$arrayElemAt": ["$users", 1]}, "_", {"$arrayElemAt": ["$users", 0]}]}
+        ]}}}]
+    ).modified_count
+
+    removed = 0
+    if not updated and "pair_key_unique" in matches.index_information():
+        return updated, removed
+    duplicates = matches.aggregate([
+        {"$sort": {"timestamp": 1}},
+        {"$group": {"_id": "$pair_key", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    for group in duplicates:
+        removed += matches.delete_many({"_id": {"$in": group["ids"][1:]}}).deleted_count
+    return updated, removed
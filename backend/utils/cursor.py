@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+
+
+def parse_timestamp(value):
+    """Naive UTC datetime from an ISO string; timestamps are stored that way."""
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def encode_cursor(doc):
+    """Page cursor for ``doc``: its timestamp and ``_id``, e.g. ``2024-05-01T10:00:00_66325f...``.
+
+    Several documents can share a timestamp, so the ``_id`` breaks ties and
+    pages neither skip nor repeat them.
+    """
+    return f"{doc['timestamp'].isoformat()}_{doc['_id']}"
+
+
+def decode_cursor(value):
+    """``(timestamp, _id)`` from a cursor, or ``None`` for an empty one.
+
+    A bare ISO timestamp is still accepted and gives ``_id`` None. Raises
+    ``ValueError`` for anything else.
+    """
+    if not value:
+        return None
+    timestamp, _, object_id = value.rpartition('_')
+    if not timestamp:
+        return parse_timestamp(value), None
+    if not ObjectId.is_valid(object_id):
+        raise ValueError(f"Invalid cursor: {value}")
+    return parse_timestamp(timestamp), ObjectId(object_id)
+
+
+def cursor_query(before=None, after=None):
+    """Filter for documents strictly between two decoded cursors, in (timestamp, _id) order."""
+    clauses = []
+    for cursor, op in ((before, "$lt"), (after, "$gt")):
+        if not cursor:
+            continue
+        timestamp, object_id = cursor
+        if object_id is None:
+            clauses.append({"timestamp": {op: timestamp}})
+        else:
+            clauses.append({"$or": [
+                {"timestamp": {op: timestamp}},
+                {"timestamp": timestamp, "_id": {op: object_id}},
+            ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def cursor_sort(direction):
+    return [("timestamp", direction), ("_id", direction)]
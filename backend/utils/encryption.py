@@ -1,6 +1,10 @@
+import atexit
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
+from utils.offload import run_blocking
 
 load_dotenv()
 
@@ -11,8 +15,48 @@ if not FERNET_KEY:
 
 fernet = Fernet(FERNET_KEY.encode())
 
+# Batches smaller than this are decrypted inline; thread hand-off costs more
+# than it saves for a handful of messages.
+PARALLEL_DECRYPT_THRESHOLD = int(os.getenv("PARALLEL_DECRYPT_THRESHOLD", 64))
+DECRYPT_WORKERS = int(os.getenv("DECRYPT_WORKERS", os.cpu_count() or 4))
+
+_decrypt_pool = None
+_decrypt_pool_lock = threading.Lock()
+
 def encrypt_message(plain_text: str) -> str:
     return fernet.encrypt(plain_text.encode()).decode()
 
 def decrypt_message(encrypted_text: str) -> str:
     return fernet.decrypt(encrypted_text.encode()).decode()
+
+def _decrypt_or_passthrough(encrypted_texts):
+    # Messages that fail to decrypt (e.g. stored before encryption was added)
+    # are returned unchanged, as the chat history has always done.
+    results = []
+    for text in encrypted_texts:
+        try:
+            results.append(decrypt_message(text))
+        except Exception:
+            results.append(text)
+    return results
+
+def _get_decrypt_pool():
+    global _decrypt_pool
+    with _decrypt_pool_lock:
+        if _decrypt_pool is None:
+            _decrypt_pool = ThreadPoolExecutor(max_workers=DECRYPT_WORKERS, thread_name_prefix="decrypt")
+            atexit.register(_decrypt_pool.shutdown)
+        return _decrypt_pool
+
+def _decrypt_parallel(encrypted_texts):
+    chunk_size = -(-len(encrypted_texts) // DECRYPT_WORKERS)
+    chunks = [encrypted_texts[i:i + chunk_size] for i in range(0, len(encrypted_texts), chunk_size)]
+    return [text for chunk in _get_decrypt_pool().map(_decrypt_or_passthrough, chunks) for text in chunk]
+
+def decrypt_messages(encrypted_texts):
+    """Decrypt a list of messages, in parallel for large batches."""
+    encrypted_texts = list(encrypted_texts)
+    if len(encrypted_texts) < PARALLEL_DECRYPT_THRESHOLD or DECRYPT_WORKERS < 2:
+        return _decrypt_or_passthrough(encrypted_texts)
+    # Waiting on the pool from a greenthread would block the eventlet hub.
+    return run_blocking(_decrypt_parallel, encrypted_texts)
@@ -0,0 +1,73 @@
+from pymongo import UpdateOne
+
+def _valid(lat, lng):
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def parse_location(detail):
+    """Return ``{"lat", "lng"}`` from any of the shapes user_details has used."""
+    if not detail:
+        return None
+
+    geo = detail.get("location_geo")
+    if isinstance(geo, dict) and geo.get("type") == "Point":
+        lng, lat = geo["coordinates"]
+        return {"lat": lat, "lng": lng}
+
+    if "location_coordinates" in detail:
+        coords = detail["location_coordinates"]
+        if isinstance(coords, dict):
+            try:
+                lat = float(coords.get("lat", 0))
+                lng = float(coords.get("lng", 0))
+                if lat != 0 and lng != 0:
+                    return {"lat": lat, "lng": lng}
+            except (ValueError, TypeError):
+                pass
+    try:
+        lat = detail.get("latitude")
+        lng = detail.get("longitude")
+        if lat is not None and lng is not None:
+            return {
+                "lat": float(lat),
+                "lng": float(lng)
+            }
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def geo_point(detail):
+    """GeoJSON point for the 2dsphere index, or None if the location is unusable."""
+    location = parse_location(dict(detail or {}, location_geo=None))
+    if not location or not _valid(location["lat"], location["lng"]):
+        return None
+    return {"type": "Point", "coordinates": [location["lng"], location["lat"]]}
+
+
+def refresh_location(details, user_id):
+    detail = details.find_one({"user_id": user_id})
+    if not detail:
+        return None
+    point = geo_point(detail)
+    if point:
+        details.update_one({"_id": detail["_id"]}, {"$set": {"location_geo": point}})
+    else:
+        details.update_one({"_id": detail["_id"]}, {"$unset": {"location_geo": ""}})
+    return point
+
+
+def normalize_locations(details, batch_size=500):
+    projection = {"location_coordinates": 1, "latitude": 1, "longitude": 1}
+    ops = []
+    updated = 0
+    for detail in details.find({}, projection):
+        point = geo_point(detail)
+        update = {"$set": {"location_geo": point}} if point else {"$unset": {"location_geo": ""}}
+        ops.append(UpdateOne({"_id": detail["_id"]}, update))
+        if len(ops) >= batch_size:
+            updated += details.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += details.bulk_write(ops, ordered=False).modified_count
+    return updated
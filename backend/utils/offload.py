@@ -0,0 +1,24 @@
+"""Running blocking work without stalling the eventlet hub.
+
+The Socket.IO server runs under eventlet without monkey patching, so a
+greenthread that blocks on a lock, a queue or a long C call stops every
+other connection in the process. Such work goes through ``run_blocking``:
+inside an eventlet greenthread it runs on eventlet's pool of native threads
+(``eventlet.tpool``) while the hub keeps serving; anywhere else (scripts,
+the threading-mode load test) it just runs inline.
+"""
+
+
+def in_greenthread():
+    try:
+        from eventlet import greenthread
+    except ImportError:
+        return False
+    return isinstance(greenthread.getcurrent(), greenthread.GreenThread)
+
+
+def run_blocking(fn, *args, **kwargs):
+    if in_greenthread():
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,24 @@
+from bson.objectid import ObjectId
+
+
+def as_object_id(user_id):
+    """``user_id`` as an ObjectId, or None if it is not a valid one."""
+    if isinstance(user_id, ObjectId):
+        return user_id
+    return ObjectId(user_id) if ObjectId.is_valid(user_id) else None
+
+
+def user_id_forms(user_ids):
+    """``user_ids`` as both ObjectIds and strings.
+
+    user_details and user_interests store user_id as an ObjectId from the
+    register flow but as a string in some older or seeded records, so
+    ``$in``/``$nin`` filters need both forms.
+    """
+    forms = []
+    for user_id in user_ids:
+        forms.append(str(user_id))
+        object_id = as_object_id(user_id)
+        if object_id:
+            forms.append(object_id)
+    return forms
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useCallback, useRef } from 'react';
+import React, { useState, useEffect, useLayoutEffect, useCallback, useRef } from 'react';
 import { MessageCircle, Send, Heart } from 'lucide-react';
 import io from 'socket.io-client';
 import { toast } from 'sonner'
@@ -15,7 +15,7 @@ interface Match {
   lastMessage?: string;
   lastTimestamp?: string;
   lastSender?: string;
-  lastRead?: string;
+  unreadCount?: number;
 }
 
 interface Message {
@@ -23,6 +23,8 @@ interface Message {
   receiver: string;
   message: string;
   timestamp?: string;
+  _id?: string;
+  cursor?: string;
 }
 
 interface ChatInterfaceProps {
@@ -41,12 +43,17 @@ const normalizeTimestamp = (ts?: string) => {
 const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: ChatInterfaceProps) => {
   const [matches, setMatches] = useState<Match[]>([]);
   const [messages, setMessages] = useState<Message[]>([]);
+  const [hasOlderMessages, setHasOlderMessages] = useState(false);
   const [loggedInEmail, setLoggedInEmail] = useState('');
   const [newMessage, setNewMessage] = useState('');
-  const [onlineUsers, setOnlineUsers] = useState<string[]>([]); // Store all online users emails
+  const [onlineUsers, setOnlineUsers] = useState<string[]>([]); // Emails of online matches (and ourselves)
 
   const socketRef = useRef<any>(null);
   const chatEndRef = useRef<HTMLDivElement>(null);
+  const messagesRef = useRef<HTMLDivElement>(null);
+  // Distance from the bottom of the message list to keep while older
+  // messages are prepended above the ones on screen.
+  const keepScrollRef = useRef<number | null>(null);
   const selectedChatRef = useRef<Match | null>(null);
 
   useEffect(() => {
@@ -66,55 +73,67 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
     }).format(date);
   };
 
-  const fetchReadReceipt = async (user: string, chatWith: string) => {
-    try {
-      const res = await fetch(`${SOCKET_SERVER}/chat/read_receipt?user=${user}&chat_with=${chatWith}`);
-      const data = await res.json();
-      return data?.last_read || null;
-    } catch {
-      return null;
-    }
-  };
-
-  const fetchChatHistory = async (user1: string, user2: string): Promise<Message[]> => {
+  const fetchHistoryPage = async (
+    user1: string,
+    user2: string,
+    before?: string
+  ): Promise<{ messages: Message[]; hasMore: boolean }> => {
     try {
+      const beforeParam = before ? `&before=${encodeURIComponent(before)}` : '';
       const res = await fetch(
-        `${SOCKET_SERVER}/chat/history?user1=${encodeURIComponent(user1)}&user2=${encodeURIComponent(user2)}`
+        `${SOCKET_SERVER}/chat/history?user1=${encodeURIComponent(user1)}&user2=${encodeURIComponent(user2)}${beforeParam}`
       );
       const data = await res.json();
-      return (data.messages || []).map((msg: Message) => ({
-        ...msg,
-        timestamp: normalizeTimestamp(msg.timestamp),
-      }));
+      return {
+        messages: (data.messages || []).map((msg: Message) => ({
+          ...msg,
+          timestamp: normalizeTimestamp(msg.timestamp),
+        })),
+        hasMore: !!data.has_more,
+      };
     } catch (err) {
       toast.error('Failed to load chat history:');
-      return [];
+      return { messages: [], hasMore: false };
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!selectedChat?.email || !loggedInEmail || messages.length === 0) return;
+    const oldest = messages[0];
+    const page = await fetchHistoryPage(loggedInEmail, selectedChat.email, oldest.cursor || oldest.timestamp);
+    const container = messagesRef.current;
+    keepScrollRef.current = container ? container.scrollHeight - container.scrollTop : null;
+    setMessages((prev) => [...page.messages, ...prev]);
+    setHasOlderMessages(page.hasMore);
+  };
+
   const fetchMatches = useCallback(async () => {
     if (!loggedInEmail) return;
     try {
-      const res = await fetch(`${SOCKET_SERVER}/matches/get_mutual_matches?email=${encodeURIComponent(loggedInEmail)}`);
-      const data = await res.json();
+      // Two requests however many matches there are: the matches, and the
+      // conversation summaries holding each last message and unread count.
+      const [matchesRes, conversationsRes] = await Promise.all([
+        fetch(`${SOCKET_SERVER}/matches/get_mutual_matches?email=${encodeURIComponent(loggedInEmail)}`),
+        fetch(`${SOCKET_SERVER}/chat/conversations?user=${encodeURIComponent(loggedInEmail)}`),
+      ]);
+      const data = await matchesRes.json();
       const rawMatches = data.matches || [];
-
-      const matchesWithMeta: Match[] = await Promise.all(
-        rawMatches.map(async (match: Match) => {
-          const history = await fetchChatHistory(loggedInEmail, match.email);
-          const last = history[history.length - 1];
-          const lastRead = await fetchReadReceipt(loggedInEmail, match.email);
-          return {
-            ...match,
-            lastMessage: last?.message,
-            lastTimestamp: last?.timestamp,
-            lastSender: last?.sender,
-            lastRead: lastRead ? normalizeTimestamp(lastRead) : undefined,
-            online: false,
-          };
-        })
+      const conversations = new Map<string, any>(
+        ((await conversationsRes.json()).conversations || []).map((c: any) => [c.chat_with, c])
       );
 
+      const matchesWithMeta: Match[] = rawMatches.map((match: Match) => {
+        const conversation = conversations.get(match.email);
+        return {
+          ...match,
+          lastMessage: conversation?.last_message,
+          lastTimestamp: conversation?.last_timestamp ? normalizeTimestamp(conversation.last_timestamp) : undefined,
+          lastSender: conversation?.last_sender,
+          unreadCount: conversation?.unread_count || 0,
+          online: false,
+        };
+      });
+
       matchesWithMeta.sort((a, b) => {
         const aTime = a.lastTimestamp ? new Date(a.lastTimestamp).getTime() : 0;
         const bTime = b.lastTimestamp ? new Date(b.lastTimestamp).getTime() : 0;
@@ -123,13 +142,7 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
 
       setMatches(matchesWithMeta);
 
-      const unreadCount = matchesWithMeta.reduce((acc, m) => {
-        const unread =
-          m.lastMessage &&
-          m.lastSender !== loggedInEmail &&
-          (!m.lastRead || new Date(m.lastTimestamp || '').getTime() > new Date(m.lastRead).getTime());
-        return acc + (unread ? 1 : 0);
-      }, 0);
+      const unreadCount = matchesWithMeta.filter((m) => (m.unreadCount || 0) > 0).length;
 
       onUnreadCountChange(unreadCount);
     } catch (err) {
@@ -153,15 +166,27 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
     const socket = io(SOCKET_SERVER, { query: { email: loggedInEmail } });
     socketRef.current = socket;
 
-    socket.on('online_users', (onlineEmails: string[]) => {
-      setOnlineUsers(onlineEmails); 
+    // Load a snapshot of online matches on every (re)connect, then apply deltas.
+    socket.on('connect', async () => {
+      try {
+        const res = await fetch(`${SOCKET_SERVER}/chat/presence?email=${encodeURIComponent(loggedInEmail)}`);
+        const data = await res.json();
+        setOnlineUsers([loggedInEmail, ...(data.online || [])]);
+      } catch {
+        setOnlineUsers([loggedInEmail]);
+      }
+    });
 
-      setMatches((prev) =>
-        prev.map((match) => ({
-          ...match,
-          online: onlineEmails.includes(match.email), 
-        }))
-      );
+    socket.on('disconnect', () => {
+      setOnlineUsers([]);
+    });
+
+    socket.on('user_online', (emails: string[]) => {
+      setOnlineUsers((prev) => Array.from(new Set([...prev, ...emails])));
+    });
+
+    socket.on('user_offline', (emails: string[]) => {
+      setOnlineUsers((prev) => prev.filter((email) => !emails.includes(email)));
     });
 
     socket.on('receive_message', (msg: Message) => {
@@ -184,6 +209,11 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
                 lastMessage: msg.message,
                 lastTimestamp: fixedTimestamp,
                 lastSender: msg.sender,
+                // The open chat is marked read by the read receipt effect.
+                unreadCount:
+                  msg.sender !== loggedInEmail && !isForCurrentChat
+                    ? (m.unreadCount || 0) + 1
+                    : m.unreadCount,
               }
             : m
         );
@@ -195,12 +225,24 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
     });
 
     return () => {
-      socket.off('online_users');
+      socket.off('connect');
+      socket.off('disconnect');
+      socket.off('user_online');
+      socket.off('user_offline');
       socket.off('receive_message');
       socket.disconnect();
     };
   }, [loggedInEmail]);
 
+  useEffect(() => {
+    setMatches((prev) =>
+      prev.map((match) => ({
+        ...match,
+        online: onlineUsers.includes(match.email),
+      }))
+    );
+  }, [onlineUsers]);
+
   useEffect(() => {
     fetchMatches();
   }, [fetchMatches]);
@@ -212,33 +254,47 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
         user1: loggedInEmail,
         user2: selectedChat.email,
       });
-      fetchChatHistory(loggedInEmail, selectedChat.email).then(setMessages);
+      fetchHistoryPage(loggedInEmail, selectedChat.email).then((page) => {
+        setMessages(page.messages);
+        setHasOlderMessages(page.hasMore);
+      });
     } else {
       setMessages([]);
+      setHasOlderMessages(false);
     }
   }, [selectedChat, loggedInEmail]);
 
+  // Receipts and auto-scroll follow the newest message only, so loading
+  // older messages above it triggers neither.
+  const lastMsg = messages.length > 0 ? messages[messages.length - 1] : undefined;
+  const lastMsgKey = lastMsg ? lastMsg._id || `${lastMsg.timestamp}_${lastMsg.sender}_${lastMsg.message}` : '';
+  const lastMsgTimestamp = lastMsg?.timestamp;
+
   useEffect(() => {
-    if (selectedChat?.email && loggedInEmail && messages.length > 0) {
-      const lastMsg = messages[messages.length - 1];
-      if (lastMsg?.timestamp) {
-        fetch(`${SOCKET_SERVER}/chat/read_receipt`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            user: loggedInEmail,
-            chat_with: selectedChat.email,
-            timestamp: lastMsg.timestamp,
-          }),
-        }).then(() => {
-          fetchMatches(); 
-        });
-      }
+    if (selectedChat?.email && loggedInEmail && lastMsgTimestamp) {
+      fetch(`${SOCKET_SERVER}/chat/read_receipt`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          user: loggedInEmail,
+          chat_with: selectedChat.email,
+          timestamp: lastMsgTimestamp,
+        }),
+      }).then(() => {
+        fetchMatches(); 
+      });
     }
-  }, [selectedChat, messages, loggedInEmail, fetchMatches]);
+  }, [selectedChat, lastMsgKey, lastMsgTimestamp, loggedInEmail, fetchMatches]);
 
   useEffect(() => {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' });
+  }, [lastMsgKey]);
+
+  useLayoutEffect(() => {
+    const container = messagesRef.current;
+    if (keepScrollRef.current === null || !container) return;
+    container.scrollTop = container.scrollHeight - keepScrollRef.current;
+    keepScrollRef.current = null;
   }, [messages]);
 
   const handleSendMessage = useCallback(() => {
@@ -281,12 +337,7 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
           ) : (
             <div className="py-2">
               {matches.map((match) => {
-                const unread =
-                  match.lastMessage &&
-                  match.lastSender !== loggedInEmail &&
-                  (!match.lastRead ||
-                    new Date(match.lastTimestamp || '').getTime() >
-                      new Date(match.lastRead).getTime());
+                const unread = (match.unreadCount || 0) > 0;
 
                 return (
                   <div
@@ -371,7 +422,14 @@ const ChatInterface = ({ onSelectChat, selectedChat, onUnreadCountChange }: Chat
               </div> */}
             </div>
 
-            <div className="flex-1 overflow-y-auto p-4 space-y-4 bg-gray-50">
+            <div ref={messagesRef} className="flex-1 overflow-y-auto p-4 space-y-4 bg-gray-50">
+              {hasOlderMessages && (
+                <div className="text-center">
+                  <button onClick={loadOlderMessages} className="text-sm text-gray-500 hover:underline">
+                    Load older messages
+                  </button>
+                </div>
+              )}
               {messages.length === 0 ? (
                 <div className="text-center text-gray-400 italic pt-20">No messages yet. Say hello! 👋</div>
               ) : (
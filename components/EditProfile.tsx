@@ -119,7 +119,7 @@ export default function EditProfile({
         </h3>
         <div className="space-y-6">
           <InputField label="Full Name" name="name" value={formData.name ?? ""} onChange={onFormChange} />
-          <SelectField label="Age Group" name="age" value={formData.age ?? ""} onChange={onFormChange} options={ageGroupOptions} />
+          <InputField label="Age" name="age" type="number" value={formData.age ?? ""} onChange={onFormChange} />
           <SelectField label="Height" name="height" value={formData.height ?? ""} onChange={onFormChange} options={heightOptions} />
           <SelectField label="Gender" name="gender" value={formData.gender ?? ""} onChange={onFormChange} options={genderOptions} />
           <SelectField label="Religion" name="religion" value={formData.religion ?? ""} onChange={onFormChange} options={religionOptions} />
@@ -1,6 +1,7 @@
 'use client';
 
 import React, { useEffect, useState } from 'react';
+import io from 'socket.io-client';
 import { useRouter, usePathname } from 'next/navigation';
 import {
   MessageCircle,
@@ -15,6 +16,7 @@ import {
   Info,
 } from 'lucide-react';
 import { toast } from 'sonner';
+import { SOCKET_SERVER } from '@/lib/api';
 
 const NavBar = () => {
   const router = useRouter();
@@ -42,17 +44,7 @@ const NavBar = () => {
   useEffect(() => {
     if (!userEmail || role === 'admin') return;
 
-    const fetchCounts = () => {
-      fetch(`http://localhost:5050/matches/notifications?email=${encodeURIComponent(userEmail)}`)
-        .then(res => res.json())
-        .then(data => {
-          const count = Array.isArray(data)
-            ? data.filter((n: any) => n.type === 'request').length
-            : 0;
-          setRequestCount(count);
-        })
-        .catch(() => setRequestCount(0));
-
+    const fetchSentCount = () => {
       fetch(`http://localhost:5050/matches/sent_requests?email=${encodeURIComponent(userEmail)}`)
         .then(res => res.json())
         .then(data => {
@@ -62,9 +54,57 @@ const NavBar = () => {
         .catch(() => setSentRequestCount(0));
     };
 
-    fetchCounts();
-    const interval = setInterval(fetchCounts, 10000);
-    return () => clearInterval(interval);
+    // Counts are pushed over the socket. On reconnect the server replays
+    // anything newer than the last notification we saw (`after`: its cursor,
+    // or a naive UTC timestamp like the ones the server sends).
+    const toTime = (ts: string) => new Date(ts.endsWith('Z') ? ts : ts + 'Z').getTime();
+    let lastSeen = new Date().toISOString().replace('Z', '');
+    let lastSeenTime = toTime(lastSeen);
+    const socket = io(SOCKET_SERVER, { query: { email: userEmail, after: lastSeen, presence: '0' } });
+    socket.io.on('reconnect_attempt', () => {
+      socket.io.opts.query = { email: userEmail, after: lastSeen, presence: '0' };
+    });
+
+    const track = (note: any) => {
+      if (!note?.timestamp || !note?.cursor) return;
+      // Same-millisecond notes are ordered by cursor, which ends in the _id.
+      const time = toTime(note.timestamp);
+      if (time > lastSeenTime || (time === lastSeenTime && note.cursor > lastSeen)) {
+        lastSeen = note.cursor;
+        lastSeenTime = time;
+      }
+    };
+
+    const seen = (note: any) => {
+      track(note);
+      // A match means one of our sent requests was accepted.
+      if (note?.type === 'match') fetchSentCount();
+    };
+
+    socket.on('notification', seen);
+    socket.on('notifications', (notes: any[]) => notes.forEach(seen));
+    socket.on('notification_count', (counts: { requests: number }) => {
+      setRequestCount(counts.requests);
+    });
+
+    fetch(`http://localhost:5050/matches/notifications?email=${encodeURIComponent(userEmail)}`)
+      .then(res => res.json())
+      .then(data => {
+        const count = Array.isArray(data)
+          ? data.filter((n: any) => n.type === 'request').length
+          : 0;
+        setRequestCount(count);
+        if (Array.isArray(data)) data.forEach(track);
+      })
+      .catch(() => setRequestCount(0));
+    fetchSentCount();
+
+    return () => {
+      socket.off('notification');
+      socket.off('notifications');
+      socket.off('notification_count');
+      socket.disconnect();
+    };
   }, [userEmail, role]);
 
   const currentView = (() => {